@@ -6,6 +6,7 @@ by instances of pytorch.train.Trainer.
 """
 import io
 import abc
+import math
 from pathlib import Path
 
 import numpy as np
@@ -82,11 +83,14 @@ class Module(nn.Module, Configurable, abc.ABC):
             in_config_path,
             consider_mpi=consider_mpi,
         )
+        # The module is freshly created, hence the parameters can be replaced
+        # by the loaded tensors instead of copying them.
         return module.load_checkpoint(
             checkpoint_path=checkpoint_path,
             in_checkpoint_path=in_checkpoint_path,
             map_location=map_location,
             consider_mpi=consider_mpi,
+            assign=True,
         )
 
     def load_checkpoint(
@@ -96,6 +100,7 @@ class Module(nn.Module, Configurable, abc.ABC):
 
             map_location='cpu',
             consider_mpi=False,
+            assign=False,
     ) -> 'Module':
         """Update the module parameters from the given checkpoint.
 
@@ -107,6 +112,14 @@ class Module(nn.Module, Configurable, abc.ABC):
                 If True and mpi is used, only read config_path and
                 checkpoint_path once and broadcast the content with mpi.
                 Reduces the io load.
+            assign:
+                If True, the loaded tensors replace the parameters and
+                buffers of the module (`load_state_dict(..., assign=True)`),
+                instead of being copied into them. This avoids holding two
+                copies of the parameters in memory, but the parameters will
+                be on the device given by `map_location`. Hence, only use it
+                for freshly created modules (e.g. no optimizer holds a
+                reference to the parameters). Ignored for torch < 2.1.
 
         Returns:
 
@@ -130,7 +143,11 @@ class Module(nn.Module, Configurable, abc.ABC):
                 map_location=map_location,
             )
         else:
-            checkpoint = torch.load(checkpoint_path, map_location=map_location)
+            # mmap the tensor storages instead of reading the whole file
+            # into memory before the tensors are created.
+            from padertorch.io import load_checkpoint
+            checkpoint = load_checkpoint(
+                checkpoint_path, map_location=map_location)
 
         if in_checkpoint_path:
             for part in in_checkpoint_path.split('.'):
@@ -139,7 +156,12 @@ class Module(nn.Module, Configurable, abc.ABC):
                     checkpoint = checkpoint[part]
                 except KeyError:
                     raise ValueError(part, in_checkpoint_path, checkpoint)
-        self.load_state_dict(checkpoint)
+
+        from distutils.version import LooseVersion
+        if assign and LooseVersion(torch.__version__) >= '2.1':
+            self.load_state_dict(checkpoint, assign=True)
+        else:
+            self.load_state_dict(checkpoint)
 
         return self
 
@@ -309,7 +331,18 @@ class Model(Module, Configurable, abc.ABC):
            any entries by the end of modify_summary.
         """
         for key, scalar in summary['scalars'].items():
-            summary['scalars'][key] = np.mean(scalar)
+            if isinstance(scalar, (list, tuple)) and len(scalar) > 0:
+                # The SummaryHook collects python floats. Averaging them in
+                # python is faster than the conversion to an array, that
+                # np.mean would do, and fsum is exact.
+                try:
+                    summary['scalars'][key] = math.fsum(scalar) / len(scalar)
+                except (ValueError, OverflowError):
+                    # fsum raises for inf + -inf and for an intermediate
+                    # overflow, where np.mean returns nan or inf.
+                    summary['scalars'][key] = np.mean(scalar)
+            else:
+                summary['scalars'][key] = np.mean(scalar)
 
         assert len(
             summary['buffers']) == 0, "intermediate format buffers has to be converted during modify_summary"
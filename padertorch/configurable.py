@@ -495,13 +495,9 @@ class Configurable:
 
         def load_config(config_path):
             if config_path.suffix == '.json':
-                import json
-                with config_path.open() as fp:
-                    configurable_config = json.load(fp)
+                configurable_config = _json_loads(config_path.read_bytes())
             elif config_path.suffix == '.yaml':
-                import yaml
-                with config_path.open() as fp:
-                    configurable_config = yaml.safe_load(fp)
+                configurable_config = _load_yaml_with_json_cache(config_path)
             else:
                 raise ValueError(config_path)
             return configurable_config
@@ -515,12 +511,113 @@ class Configurable:
             configurable_config = dlp_mpi.bcast(configurable_config)
         else:
             configurable_config = load_config(config_path=config_path)
-        if config_path != '':
-            for part in in_config_path.split('.'):
-                configurable_config = configurable_config[part]
+        configurable_config = _nested_getter(in_config_path)(
+            configurable_config)
         return cls.from_config(configurable_config)
 
 
+@functools.lru_cache(maxsize=None)
+def _nested_getter(path: str):
+    """Return a cached getter for a nested, dot separated path.
+
+    >>> _nested_getter('trainer.model')({'trainer': {'model': 1}})
+    1
+    >>> _nested_getter('')({'trainer': {'model': 1}})
+    {'trainer': {'model': 1}}
+    """
+    parts = tuple(path.split('.')) if path else ()
+
+    def getter(obj):
+        for part in parts:
+            obj = obj[part]
+        return obj
+
+    return getter
+
+
+def _json_loads(content: bytes):
+    """Parse json with `orjson`, if it is installed, else with `json`.
+
+    >>> _json_loads(b'{"a": [1, 2.5, null]}')
+    {'a': [1, 2.5, None]}
+    >>> _json_loads(b'{"a": NaN}')
+    {'a': nan}
+    """
+    import json
+    try:
+        import orjson
+    except ImportError:
+        return json.loads(content)
+    try:
+        return orjson.loads(content)
+    except orjson.JSONDecodeError:
+        # e.g. NaN is not valid json, but accepted by the json module
+        return json.loads(content)
+
+
+def _load_yaml_with_json_cache(config_path: Path):
+    """Load a yaml config and optionally cache the parsed content as json.
+
+    Parsing yaml is much slower than parsing json. When the environment
+    variable `PADERTORCH_CONFIG_CACHE` points to a directory, the parsed
+    config is written there as json and reused for a yaml file with the same
+    content. The cache files are named by the sha256 of the yaml content,
+    hence a changed yaml file is never served from a stale cache, whatever
+    the mtimes say. The cache is only written, when the json roundtrip is
+    lossless (e.g. no int keys) and silently skipped, when the cache
+    directory is not writable.
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as tmp_dir:
+    ...     os.environ['PADERTORCH_CONFIG_CACHE'] = str(Path(tmp_dir) / 'cache')
+    ...     config_path = Path(tmp_dir) / 'config.yaml'
+    ...     _ = config_path.write_text('a: 1\\nb: [1, 2]\\n')
+    ...     print(_load_yaml_with_json_cache(config_path))
+    ...     print(len(list((Path(tmp_dir) / 'cache').iterdir())))
+    ...     print(_load_yaml_with_json_cache(config_path))
+    ...     _ = config_path.write_text('a: 2\\nb: [1, 2]\\n')
+    ...     print(_load_yaml_with_json_cache(config_path))
+    ...     del os.environ['PADERTORCH_CONFIG_CACHE']
+    {'a': 1, 'b': [1, 2]}
+    1
+    {'a': 1, 'b': [1, 2]}
+    {'a': 2, 'b': [1, 2]}
+    """
+    content = config_path.read_bytes()
+    cache_dir = os.environ.get('PADERTORCH_CONFIG_CACHE')
+    if cache_dir:
+        import hashlib
+        cache_path = (
+            Path(cache_dir) / f'{hashlib.sha256(content).hexdigest()}.json'
+        )
+        try:
+            return _json_loads(cache_path.read_bytes())
+        except (OSError, ValueError):
+            pass
+
+    import yaml
+    # The C implementation is much faster, but only available when
+    # pyyaml is compiled against libyaml.
+    configurable_config = yaml.load(
+        content, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+
+    if cache_dir:
+        import json
+        try:
+            cache_content = json.dumps(configurable_config)
+            if json.loads(cache_content) == configurable_config:
+                # Write to a temporary file and rename it to be safe against
+                # concurrent readers (e.g. multiple workers or mpi processes).
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = cache_path.with_name(
+                    f'{cache_path.name}.{os.getpid()}')
+                tmp_path.write_text(cache_content)
+                os.replace(tmp_path, cache_path)
+        except (OSError, TypeError, ValueError):
+            pass
+    return configurable_config
+
+
 def _test_config(config, updates):
     """Test if the config updates are valid.
 
@@ -30,7 +30,7 @@ class WaveNet(Model):
         )
 
     def feature_extraction(self, x, seq_len=None):
-        x = self.mel_transform(torch.sum(x**2, dim=(-1,))).transpose(-2, -1)
+        x = self.mel_transform.forward_stft(x).transpose(-2, -1)
         x = self.in_norm(x, sequence_lengths=seq_len)
         x = rearrange(x, 'b c f t -> b (c f) t')
         return x
@@ -43,7 +43,9 @@ class WaveNet(Model):
 
     def review(self, inputs, outputs):
         predictions, targets = outputs
-        ce = torch.nn.CrossEntropyLoss(reduction='none')(predictions, targets)
+        ce = torch.nn.functional.cross_entropy(
+            predictions, targets, reduction='none'
+        )
         summary = dict(
             loss=ce.mean(),
             scalars=dict(),
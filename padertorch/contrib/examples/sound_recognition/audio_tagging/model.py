@@ -23,8 +23,11 @@ class WALNet(Model):
     >>> review = tagger.review(inputs, outputs)
     """
 
-    def __init__(self, sample_rate, stft_size, output_size):
+    def __init__(self, sample_rate, stft_size, output_size, autocast=False):
         super().__init__()
+        # If True, the CNN runs in bfloat16 autocast. The feature extraction
+        # (log and normalization statistics) and the loss stay in float32.
+        self.autocast = autocast
         self.feature_extractor = NormalizedLogMelExtractor(
             sample_rate=sample_rate, stft_size=stft_size,
             number_of_filters=128,
@@ -51,13 +54,18 @@ class WALNet(Model):
             pool_size=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2, 2, 1, 1],
             norm='batch',
             activation_fn='relu',
+            channels_last=True,
         )
 
     def forward(self, inputs):
         x, seq_len = inputs['stft'], inputs['seq_len']
         x, *_ = self.feature_extractor(x, seq_len)
-        y, seq_len = self.cnn(x, seq_len)
-        return (nn.Sigmoid()(y.squeeze(2)), seq_len), x
+        with torch.autocast(
+                device_type=x.device.type, dtype=torch.bfloat16,
+                enabled=self.autocast,
+        ):
+            y, seq_len = self.cnn(x, seq_len)
+        return (torch.sigmoid(y.squeeze(2).float()), seq_len), x
 
     def review(self, inputs, outputs):
         # compute loss
@@ -65,7 +73,9 @@ class WALNet(Model):
         (y, seq_len), x = outputs
 
         y = Mean(axis=-1)(y, seq_len)
-        bce = nn.BCELoss(reduction='none')(y, targets).sum(-1).mean()
+        bce = nn.functional.binary_cross_entropy(
+            y, targets, reduction='none'
+        ).sum(-1).mean()
 
         # create review including metrics and visualizations
         review = dict(
@@ -113,7 +123,10 @@ class WALNet(Model):
                 image = image[:, 0]
             if image.dim() == 3:
                 image = image.unsqueeze(1)
-            summary['images'][key] = make_grid(
-                image.flip(2),  normalize=True, scale_each=False, nrow=1
-            )
+            # flip copies the images, hence they can be normalized in-place
+            # instead of letting make_grid(normalize=True) clone them again
+            image = image.flip(2)
+            low, high = image.min(), image.max()
+            image.sub_(low).div_(torch.clamp(high - low, min=1e-5))
+            summary['images'][key] = make_grid(image, nrow=1)
         return summary
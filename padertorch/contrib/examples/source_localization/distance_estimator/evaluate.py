@@ -25,7 +25,6 @@ from pathlib import Path
 import numpy as np
 from sacred import Experiment
 import torch
-from torch import nn
 
 import dlp_mpi
 from .model import DistanceEstimator
@@ -114,8 +113,8 @@ def evaluate(storage_dir, checkpoint_name, batch_size):
         ):
             model_output = model(pt.data.example_to_device(batch))
             target = batch['label']
-            cls_probs = nn.Softmax(dim=-1)(model_output)
-            est_cls = cls_probs.argmax(dim=-1)
+            # The softmax is monotonic, the argmax of the logits is the same
+            est_cls = model_output.argmax(dim=-1)
             est_dist = est_cls.float() * model.quant_step + model.d_min
             ae = model.l1_loss(est_dist, torch.tensor(batch['distance']))
             se = model.mse_loss(est_dist, torch.tensor(batch['distance']))
@@ -272,8 +272,8 @@ class DistanceEstimator(Model):
         # Calculate the loss and some further metrics
         target = inputs['label']
         loss = self.loss(outputs, target)
-        cls_probs = nn.Softmax(dim=-1)(outputs)
-        est_cls = cls_probs.argmax(dim=-1)
+        # The softmax is monotonic, the argmax of the logits is the same
+        est_cls = outputs.argmax(dim=-1)
         est_dist = est_cls.float() * self.quant_step + self.d_min
         ae = self.l1_loss(est_dist, inputs['distance'])
         se = self.mse_loss(est_dist, inputs['distance'])
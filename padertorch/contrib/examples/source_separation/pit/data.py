@@ -49,9 +49,10 @@ def read_audio(example, src_key="audio_path", audio_keys=None):
 def pre_batch_transform(inputs, return_keys=None):
     s = inputs['audio_data']['speech_source']
     y = inputs['audio_data']['observation']
-    S = stft(s, 512, 128)
-    Y = stft(y, 512, 128)
-    Y = einops.rearrange(Y, 't f -> t f')
+    # The features are stored as (complex) float32. Casting the stfts once
+    # lets abs and angle work on the float32 data.
+    S = stft(s, 512, 128).astype(np.complex64)
+    Y = stft(y, 512, 128).astype(np.complex64)
     S = einops.rearrange(S, 'k t f -> t k f')
     X = S  # Same for WSJ0_2MIX database
     num_frames = Y.shape[0]
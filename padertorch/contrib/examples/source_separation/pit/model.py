@@ -1,4 +1,5 @@
-import einops
+import itertools
+
 import torch
 from torch.nn.utils.rnn import PackedSequence
 import numpy as np
@@ -33,7 +34,9 @@ class PermutationInvariantTrainingModel(pt.Model):
             dropout_input=0.,
             dropout_hidden=0.,
             dropout_linear=0.,
-            output_activation='relu'
+            output_activation='relu',
+            compile=False,
+            autocast=False,
     ):
         """
 
@@ -47,6 +50,11 @@ class PermutationInvariantTrainingModel(pt.Model):
                 recurrent layer
             dropout_linear: Dropout forget ratio before first linear layer
             output_activation: Different activations. Default is 'ReLU'.
+            compile: If True, compile the input transform and the dense part
+                after the LSTM with `torch.compile` (torch >= 2.0) to fuse
+                the pointwise ops.
+            autocast: If True, the BLSTM and the dense layers run in bfloat16
+                autocast. The output and the losses stay in float32.
         """
         super().__init__()
 
@@ -67,10 +75,34 @@ class PermutationInvariantTrainingModel(pt.Model):
 
         assert dropout_linear <= 0.5, dropout_linear
         self.dropout_linear = torch.nn.Dropout(dropout_linear)
-        self.relu = torch.nn.ReLU()
+        self.autocast = autocast
+        # In-place is safe, the output of linear1 is not needed for the
+        # backward pass. Saves an allocation of the 2 * units activation.
+        self.relu = torch.nn.ReLU(inplace=True)
         self.linear1 = torch.nn.Linear(2 * units, 2 * units)
         self.linear2 = torch.nn.Linear(2 * units, F * K)
-        self.output_activation = ACTIVATION_FN_MAP[output_activation]()
+        if output_activation in ['relu', 'leaky_relu', 'elu']:
+            # Like the hidden ReLU, these can overwrite the linear2 output.
+            self.output_activation = ACTIVATION_FN_MAP[output_activation](
+                inplace=True)
+        else:
+            self.output_activation = ACTIVATION_FN_MAP[output_activation]()
+        # All permutations of the speakers, shape (K!, K). Non-persistent,
+        # to keep the state dict compatible.
+        self.register_buffer(
+            'pit_permutations',
+            torch.tensor(list(itertools.permutations(range(K)))),
+            persistent=False,
+        )
+        if compile and hasattr(torch, 'compile'):
+            # The PackedSequence handling stays outside the compiled region,
+            # the batch_sizes manipulation would cause graph breaks.
+            # With automatic dynamic shapes only the packed time axis becomes
+            # dynamic after the first recompilation, while the feature sizes
+            # (units, K and F) stay static and specialize the kernels.
+            self._estimate_mask = torch.compile(self._estimate_mask)
+            # Fuses the dropout and log1p into one elementwise kernel.
+            self._transform_input = torch.compile(self._transform_input)
 
     def forward(self, batch):
         """
@@ -84,68 +116,150 @@ class PermutationInvariantTrainingModel(pt.Model):
         """
 
         h = pt.ops.pack_sequence(batch['Y_abs'])
+        # The pointwise ops work on the packed data, only the LSTM and the
+        # unpacking need the batch_sizes.
+        batch_sizes = h.batch_sizes
 
         _, F = h.data.size()
         assert F == self.F, f'self.F = {self.F} != F = {F}'
 
-        h_data = self.dropout_input(h.data)
+        h_data = self._transform_input(h.data)
+
+        # The weights of the replicas of DataParallel are not in a single
+        # contiguous chunk, which forces cuDNN to copy them in every call.
+        # This is a no-op, when the weights are already contiguous.
+        self.blstm.flatten_parameters()
 
-        h_data = pt.ops.sequence.log1p(h_data)
-        h = PackedSequence(h_data, h.batch_sizes)
+        # Packing and unpacking stay outside of the autocast region.
+        with torch.autocast(
+                device_type=h_data.device.type, dtype=torch.bfloat16,
+                enabled=self.autocast,
+        ):
+            # Returns tensor with shape (t, b, num_directions * hidden_size)
+            h, _ = self.blstm(PackedSequence(h_data, batch_sizes))
+            mask_data = self._estimate_mask(h.data)
+
+        mask = PackedSequence(mask_data.float(), batch_sizes)
+        return pt.ops.unpack_sequence(mask)
 
-        # Returns tensor with shape (t, b, num_directions * hidden_size)
-        h, _ = self.blstm(h)
+    def _transform_input(self, h_data):
+        """Input dropout and log1p of the packed data."""
+        return torch.log1p(self.dropout_input(h_data))
 
-        h_data = self.dropout_linear(h.data)
+    def _estimate_mask(self, h_data):
+        """Dense part of forward, maps the LSTM output to the masks."""
+        h_data = self.dropout_linear(h_data)
         h_data = self.linear1(h_data)
         h_data = self.relu(h_data)
         h_data = self.linear2(h_data)
         h_data = self.output_activation(h_data)
-        h = PackedSequence(h_data, h.batch_sizes)
-
-        mask = PackedSequence(
-            einops.rearrange(h.data, 'tb (k f) -> tb k f', k=self.K),
-            h.batch_sizes,
-        )
-        return pt.ops.unpack_sequence(mask)
+        return h_data.unflatten(-1, (self.K, self.F))
 
     def review(self, batch, model_out):
+        # All utterances are processed at once. The padded frames of the
+        # masks, the observation and the targets are zero, hence they do
+        # not contribute to the squared error.
+        num_frames = torch.tensor(
+            [mask.shape[0] for mask in model_out],
+            device=model_out[0].device,
+        )
+        estimate = (
+            pt.pad_sequence(model_out, batch_first=True)
+            * pt.pad_sequence(batch['Y_abs'], batch_first=True)[..., None, :]
+        )
+        target = pt.pad_sequence(batch['X_abs'], batch_first=True)
+        cos_phase_diff = pt.pad_sequence(
+            batch['cos_phase_difference'], batch_first=True)
 
-        pit_mse_loss = list()
-        pit_ips_loss = list()
-
-        for mask, observation, target, cos_phase_diff in zip(
-                model_out,
-                batch['Y_abs'],
-                batch['X_abs'],
-                batch['cos_phase_difference']
-        ):
-            # MSE loss
-            pit_mse_loss.append(pt.ops.losses.pit_loss(
-                mask * observation[:, None, :],
-                target,
-                axis=-2
-            ))
-
-            # Ideal Phase Sensitive loss
-            pit_ips_loss.append(pt.ops.losses.pit_loss(
-                mask * observation[:, None, :],
-                target * cos_phase_diff,
-                axis=-2
-            ))
+        # MSE loss
+        pit_mse_loss, permutation = _pit_mse_loss(
+            estimate, target, num_frames, self.pit_permutations,
+            return_permutation=True,
+        )
+        # Ideal Phase Sensitive loss. The targets only differ by the phase
+        # factor, hence the permutation of the MSE loss is reused instead
+        # of a second permutation search.
+        estimate = torch.gather(
+            estimate, -2, permutation[:, None, :, None].expand_as(estimate))
+        pit_ips_loss = _mse_loss(estimate, target * cos_phase_diff, num_frames)
 
         losses = {
-                'pit_mse_loss': torch.mean(torch.stack(pit_mse_loss)),
-                'pit_ips_loss': torch.mean(torch.stack(pit_ips_loss)),
+                'pit_mse_loss': pit_mse_loss,
+                'pit_ips_loss': pit_ips_loss,
         }
 
-        b = 0   # only print image of first example in a batch
         images = dict()
-        images['observation'] = stft_to_image(batch['Y_abs'][b])
-        for i in range(model_out[b].shape[1]):
-            images[f'mask_{i}'] = mask_to_image(model_out[b][:, i, :])
-            images[f'estimation_{i}'] = stft_to_image(batch['X_abs'][b][:, 0, :])
+        # The summary hook reports only one snapshot per summary interval,
+        # hence the images are only created, when they are reported.
+        if self.create_snapshot:
+            b = 0   # only print image of first example in a batch
+            images['observation'] = stft_to_image(batch['Y_abs'][b])
+            for i in range(model_out[b].shape[1]):
+                images[f'mask_{i}'] = mask_to_image(model_out[b][:, i, :])
+                images[f'estimation_{i}'] = stft_to_image(
+                    batch['X_abs'][b][:, 0, :])
 
         return dict(losses=losses,
                     images=images
                     )
+
+
+def _mse_loss(estimate, target, num_frames):
+    """Mean over the utterances of the MSE of each utterance.
+
+    Args:
+        estimate: Zero padded estimate with shape (B, T, K, F).
+        target: Zero padded target with the same shape as `estimate`.
+        num_frames: Number of valid frames of each utterance, shape (B,).
+    """
+    B, T, K, F = estimate.shape
+    squared_error = torch.sum((estimate - target) ** 2, dim=(1, 2, 3))
+    return torch.mean(squared_error / (num_frames * K * F))
+
+
+def _pit_mse_loss(
+        estimate, target, num_frames, permutations, return_permutation=False
+):
+    """Batched version of `pt.ops.losses.pit_loss` with the MSE loss.
+
+    Args:
+        estimate: Zero padded estimate with shape (B, T, K, F).
+        target: Zero padded target with the same shape as `estimate`.
+        num_frames: Number of valid frames of each utterance, shape (B,).
+        permutations: All permutations of the speakers, shape (K!, K).
+        return_permutation: If `True`, additionally return the permutation
+            of each utterance, that minimizes the loss, shape (B, K).
+
+    Returns:
+        The mean over the utterances of the minimal MSE of each utterance.
+
+    >>> estimate = torch.rand(2, 4, 2, 3)
+    >>> target = torch.rand(2, 4, 2, 3)
+    >>> target[1, 3:] = estimate[1, 3:] = 0
+    >>> expected = torch.stack([
+    ...     pt.ops.losses.pit_loss(estimate[0], target[0], axis=-2),
+    ...     pt.ops.losses.pit_loss(estimate[1, :3], target[1, :3], axis=-2),
+    ... ]).mean()
+    >>> permutations = torch.tensor([[0, 1], [1, 0]])
+    >>> torch.allclose(_pit_mse_loss(
+    ...     estimate, target, torch.tensor([4, 3]), permutations), expected)
+    True
+    >>> _, permutation = _pit_mse_loss(
+    ...     estimate, estimate[:, :, [1, 0]], torch.tensor([4, 3]), permutations,
+    ...     return_permutation=True)
+    >>> permutation
+    tensor([[1, 0],
+            [1, 0]])
+    """
+    B, T, K, F = estimate.shape
+    # A single gather for all permutations: (B, T, K!, K, F)
+    candidates = torch.sum(
+        (estimate[:, :, permutations, :] - target[:, :, None]) ** 2,
+        dim=(1, 3, 4)
+    )
+    min_loss, idx = torch.min(candidates, dim=1)
+    min_loss = torch.mean(min_loss / (num_frames * K * F))
+    if return_permutation:
+        return min_loss, permutations[idx]
+    else:
+        return min_loss
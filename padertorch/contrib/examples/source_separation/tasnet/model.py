@@ -74,7 +74,11 @@ class TasNet(pt.Model):
         Now supports sequence lengths, but runs quite slow when used with
         sequence lengths.
         """
-        sequence = pad_sequence(batch['y'], batch_first=True)
+        if torch.is_tensor(batch['y']):
+            # Already padded, e.g., by the collate function of the train script
+            sequence = batch['y']
+        else:
+            sequence = pad_sequence(batch['y'], batch_first=True)
         sequence_lengths = batch['num_samples']
         if not torch.is_tensor(sequence_lengths):
             sequence_lengths = torch.tensor(sequence_lengths)
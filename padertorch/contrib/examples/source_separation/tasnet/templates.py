@@ -7,6 +7,9 @@ export MKL_NUM_THREADS=1
 train:
 \tpython -m {main_python_path} with config.json
 
+debug:
+\tPT_DEBUG=1 python -m {main_python_path} with config.json
+
 ccsalloc:
 \tccsalloc \\
 \t\t--res=rset=1:ncpus=4:gtx1080=1:ompthreads=1 \\
@@ -5,7 +5,12 @@ export STORAGE_ROOT=<your desired storage root>
 export OMP_NUM_THREADS=1
 export MKL_NUM_THREADS=1
 python -m padertorch.contrib.examples.source_separation.tasnet.train with database_json=${paths to your JSON}
+
+Set PT_DEBUG=1 to enter the debugger when an exception occurs.
 """
+import concurrent.futures
+import functools
+import operator
 import os
 
 import numpy as np
@@ -193,27 +198,74 @@ def on_wsj0_2mix_max():
     validate_dataset = "mix_2_spk_max_cv"
 
 
+@functools.lru_cache(maxsize=None)
+def _get_audio_pool(pid):
+    # Keyed by the process id, because a pool that is inherited by a forked
+    # prefetch worker has no running threads.
+    return concurrent.futures.ThreadPoolExecutor(max_workers=4)
+
+
 @ex.capture
 def pre_batch_transform(inputs):
+    # Submit all files of the example at once and wait once for all of them
+    # to hide the file io latency.
+    # Decode directly to float32 to avoid a float64 copy of each signal.
+    audio_pool = _get_audio_pool(os.getpid())
+    load_audio = functools.partial(pb.io.load_audio, dtype=np.float32)
+    *s, y = audio_pool.map(load_audio, [
+        *inputs['audio_path']['speech_source'],
+        inputs['audio_path']['observation'],
+    ])
     return {
-        's': np.ascontiguousarray([
-            pb.io.load_audio(p)
-            for p in inputs['audio_path']['speech_source']
-        ], np.float32),
-        'y': np.ascontiguousarray(
-            pb.io.load_audio(inputs['audio_path']['observation']), np.float32),
+        's': np.stack(s),
+        'y': y,
         'num_samples': inputs['num_samples'],
         'example_id': inputs['example_id'],
         'audio_path': inputs['audio_path'],
     }
 
 
+def collate(batch):
+    """Collate a batch and zero-pad the signals into single arrays.
+
+    Padding in one preallocated array per key avoids the allocation of an
+    array for each example and allows to move the signals with a single copy
+    to the device.
+
+    >>> batch = collate([
+    ...     {'y': np.ones(3), 's': np.ones((2, 3)), 'num_samples': 3},
+    ...     {'y': np.ones(2), 's': np.ones((2, 2)), 'num_samples': 2},
+    ... ])
+    >>> batch['y']
+    array([[1., 1., 1.],
+           [1., 1., 0.]])
+    >>> batch['s'].shape, batch['num_samples']
+    ((2, 2, 3), [3, 2])
+    """
+    batch = pt.data.utils.collate_fn(batch)
+    for key in ['y', 's']:
+        signals = batch[key]
+        num_samples = max(signal.shape[-1] for signal in signals)
+        padded = np.zeros(
+            (len(signals), *signals[0].shape[:-1], num_samples),
+            dtype=signals[0].dtype,
+        )
+        for signal, padded_signal in zip(signals, padded):
+            padded_signal[..., :signal.shape[-1]] = signal
+        batch[key] = padded
+    return batch
+
+
 def prepare_dataset(
         db, dataset: str, batch_size, chunk_size, shuffle=True,
-        prefetch=True, dataset_slice=None,
+        prefetch=True, dataset_slice=None, max_padding_rate=0.1,
 ):
     """
     This is re-used in the evaluate script
+
+    Without chunking (`chunk_size == -1`) and `batch_size > 1`, examples of
+    similar length are grouped into a batch, so that at most
+    `max_padding_rate` of a batch is padding.
     """
     dataset = db.get_dataset(dataset)
 
@@ -229,36 +281,53 @@ def prepare_dataset(
         example['num_samples'] = example['y'].shape[-1]
         return example
 
+    def _sort_batch(batch):
+        # Same as pt.data.batch.Sorter('num_samples'), but dataset.batch
+        # yields a new list for each batch, hence it can be sorted in place
+        # without the intermediate list of sorted().
+        batch.sort(key=operator.itemgetter('num_samples'), reverse=True)
+        return tuple(batch)
+
     if shuffle:
         dataset = dataset.shuffle(reshuffle=True)
 
     dataset = dataset.map(pre_batch_transform)
-    dataset = dataset.map(segmenter)
+    # The segmenter cuts all chunks of an example at once with a strided
+    # view (segment_axis). Without chunking, it would only wrap the example
+    # in a list, hence it is skipped.
+    if chunk_size != -1:
+        dataset = dataset.map(segmenter)
 
     # FilterExceptions are only raised inside the chunking code if the
     # example is too short. If chunk_size == -1, no filter exception is raised.
     catch_exception = segmenter.length > 0
     if prefetch:
+        # The thread backend starts no worker processes, hence nothing
+        # (e.g., imports) has to be re-initialized for each epoch.
         dataset = dataset.prefetch(
-            8, 16, catch_filter_exception=catch_exception)
+            8, 16, backend='t', catch_filter_exception=catch_exception)
     elif catch_exception:
         dataset = dataset.catch()
 
     if chunk_size != -1:
         dataset = dataset.unbatch()
-    else:
-        def unbatch(example):
-            assert len(example) == 1, example
-            return example[0]
-        dataset = dataset.map(unbatch)
     dataset = dataset.map(_set_num_samples)
 
     if shuffle:
         dataset = dataset.shuffle(reshuffle=True, buffer_size=128)
 
-    dataset = dataset.batch(batch_size)
-    dataset = dataset.map(pt.data.batch.Sorter('num_samples'))
-    dataset = dataset.map(pt.data.utils.collate_fn)
+    if chunk_size == -1 and batch_size > 1:
+        # The examples have different lengths. Bucketing by length reduces
+        # the padding (and the wasted computations in the model).
+        dataset = dataset.batch_dynamic_time_series_bucket(
+            batch_size=batch_size, len_key='num_samples',
+            max_padding_rate=max_padding_rate,
+            sort_key='num_samples', reverse_sort=True,
+        )
+    else:
+        dataset = dataset.batch(batch_size)
+        dataset = dataset.map(_sort_batch)
+    dataset = dataset.map(collate)
 
     return dataset
 
@@ -332,6 +401,9 @@ def prepare_and_train(_run, _log, trainer, train_dataset, validate_dataset,
 
     db = JsonDatabase(database_json)
 
+    # Each pipeline is built once and reused for the test run, the
+    # validation hook and the training. A lazy_dataset pipeline can be
+    # iterated multiple times, each iteration starts new prefetch threads.
     train_dataset = prepare_dataset_captured(db, train_dataset, shuffle=True)
     validate_dataset = prepare_dataset_captured(
         db, validate_dataset, shuffle=False, chunk_size=-1
@@ -369,7 +441,7 @@ def get_trainer(trainer_config, load_model_from, _log):
     checkpoint_path = trainer.checkpoint_dir / 'ckpt_latest.pth'
     if load_model_from is not None and not checkpoint_path.is_file():
         _log.info(f'Loading model weights from {load_model_from}')
-        checkpoint = torch.load(load_model_from)
+        checkpoint = pt.io.load_checkpoint(load_model_from, map_location='cpu')
         trainer.model.load_state_dict(checkpoint['model'])
 
     return trainer
@@ -403,5 +475,10 @@ def main(_config, _run):
 
 
 if __name__ == '__main__':
-    with pb.utils.debug_utils.debug_on(Exception):
+    if os.environ.get('PT_DEBUG'):
+        # Enter the debugger on an exception. Only enabled on request,
+        # because a batch job would wait forever in the debugger.
+        with pb.utils.debug_utils.debug_on(Exception):
+            ex.run_commandline()
+    else:
         ex.run_commandline()
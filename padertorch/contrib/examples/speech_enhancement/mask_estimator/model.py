@@ -1,3 +1,5 @@
+import copy
+
 import padertorch as pt
 import torch
 from padertorch.summary import mask_to_image, stft_to_image
@@ -5,7 +7,7 @@ from padertorch.summary import mask_to_image, stft_to_image
 
 class SimpleMaskEstimator(pt.Model):
     def __init__(self, num_features, num_units=1024, dropout=0.5,
-                 activation='elu'):
+                 activation='elu', compile=False, stft_shift=256):
         """
 
         Args:
@@ -13,6 +15,13 @@ class SimpleMaskEstimator(pt.Model):
             num_units: number of units in linear layern
             dropout: dropout forget ratio
             activation: activation for the linear layer except the output layer
+            compile: If True, compile the network with `torch.compile`
+                (torch >= 2.2), which fuses the activations and dropouts
+                into the matmul kernels. The parameter names are unchanged,
+                hence checkpoints stay compatible.
+            stft_shift: shift of the stft that is used, when the batch
+                contains the time signal `observation` instead of
+                `observation_abs`. The stft size is `2 * (num_features - 1)`.
 
         >>> SimpleMaskEstimator(513)
         SmallExampleModel(
@@ -24,12 +33,14 @@ class SimpleMaskEstimator(pt.Model):
             (4): Linear(in_features=1024, out_features=1024, bias=True)
             (5): ELU(alpha=1.0)
             (6): Linear(in_features=1024, out_features=1026, bias=True)
-            (7): Sigmoid()
           )
         )
         """
         super().__init__()
         self.num_features = num_features
+        # Mirrors pb.transform.STFT, i.e. the same features as in the
+        # numpy preprocessing, but computed on the device of the model.
+        self.stft = pt.ops.STFT(size=2 * (num_features - 1), shift=stft_shift)
         self.net = torch.nn.Sequential(
             pt.modules.Normalization(
                 'btf', (1, 1, num_features), statistics_axis='t',
@@ -46,26 +57,51 @@ class SimpleMaskEstimator(pt.Model):
             torch.nn.Linear(num_units, num_units),
             pt.mappings.ACTIVATION_FN_MAP[activation](),
             # twice num_features for speech and noise_mask
+            # The output activation (sigmoid) is applied in forward, so that
+            # review can use the fused binary_cross_entropy_with_logits.
             torch.nn.Linear(num_units, 2 * num_features),
-            # Output activation to force outputs between 0 and 1
-            torch.nn.Sigmoid()
         )
+        if compile and hasattr(self.net, 'compile'):
+            # In-place compile, `torch.compile(self.net)` would add a prefix
+            # to the keys of the state dict.
+            self.net.compile()
 
     def forward(self, batch):
 
-        x = batch['observation_abs']
-        out = self.net(x)
+        if 'observation_abs' in batch:
+            x = batch['observation_abs']
+        else:
+            x = self.stft(batch['observation']).abs()
+        logits = self.net(x)
+        # Output activation to force outputs between 0 and 1
+        out = torch.sigmoid(logits)
         return dict(
+            observation_abs=x,
+            speech_mask_logits=logits[..., :self.num_features],
+            noise_mask_logits=logits[..., self.num_features:],
             speech_mask_prediction=out[..., :self.num_features],
             noise_mask_prediction=out[..., self.num_features:],
         )
 
+    def for_inference(self):
+        """Return an int8 dynamically quantized copy for cpu inference.
+
+        The Linear layers dominate the inference time. Their weights are
+        quantized to int8, the activations are quantized on the fly.
+        """
+        # Copy before eval, so the mode of this module is unchanged. The copy
+        # is already private, hence quantize in-place.
+        return torch.quantization.quantize_dynamic(
+            copy.deepcopy(self).eval(), {torch.nn.Linear}, dtype=torch.qint8,
+            inplace=True,
+        )
+
     def review(self, batch, output):
-        noise_mask_loss = torch.nn.functional.binary_cross_entropy(
-            output['noise_mask_prediction'], batch['noise_mask_target']
+        noise_mask_loss = torch.nn.functional.binary_cross_entropy_with_logits(
+            output['noise_mask_logits'], batch['noise_mask_target']
         )
-        speech_mask_loss = torch.nn.functional.binary_cross_entropy(
-            output['speech_mask_prediction'], batch['speech_mask_target']
+        speech_mask_loss = torch.nn.functional.binary_cross_entropy_with_logits(
+            output['speech_mask_logits'], batch['speech_mask_target']
         )
         return dict(loss=noise_mask_loss + speech_mask_loss,
                     images=self.add_images(batch, output))
@@ -73,7 +109,7 @@ class SimpleMaskEstimator(pt.Model):
     @staticmethod
     def add_images(batch, output):
         speech_mask = output['speech_mask_prediction']
-        observation = batch['observation_abs']
+        observation = output['observation_abs']
         images = dict()
         images['speech_mask'] = mask_to_image(speech_mask, True)
         images['observed_stft'] = stft_to_image(observation, True)
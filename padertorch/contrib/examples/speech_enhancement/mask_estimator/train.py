@@ -36,6 +36,9 @@ def config():
         'use "with database_json=/Path/To/Json" as suffix to your call'
     )
     assert Path(database_json).exists(), database_json
+    # If not None, the output of prepare_data is cached in this folder and
+    # reused in later epochs and trainings
+    feature_cache_dir = None
     ex.observers.append(observers.FileStorageObserver(
         Path(storage_dir).expanduser().resolve() / 'sacred')
     )
@@ -44,42 +47,105 @@ def config():
 def prepare_data(example):
     stft = pb.transform.STFT(shift=256, size=1024)
     net_input = dict()
-    audio_data = dict()
-    for key in ['observation', 'speech_image', 'noise_image']:
-        audio_data[key] = stft(np.array([
-            pb.io.load_audio(audio) for audio in example['audio_path'][key]]))
-    net_input['observation_abs'] = np.abs(
-        audio_data['observation']).astype(np.float32)
-    target_mask, noise_mask = biased_binary_mask(np.stack(
-        [audio_data['speech_image'], audio_data['noise_image']], axis=0
-    ))
-    net_input['speech_mask_target'] = target_mask.astype(np.float32)
-    net_input['noise_mask_target'] = noise_mask.astype(np.float32)
+    # The stft of the observation is computed by the model on the gpu,
+    # hence only the time signal is provided.
+    net_input['observation'] = np.array([
+        pb.io.load_audio(audio, dtype=np.float32)
+        for audio in example['audio_path']['observation']
+    ])
+    # Stack the images to compute the stft with a single call:
+    # shape (2, channels, samples) -> (2, channels, frames, frequencies)
+    images = stft(np.array([
+        [pb.io.load_audio(audio) for audio in example['audio_path'][key]]
+        for key in ['speech_image', 'noise_image']
+    ]))
+    # The masks only depend on the magnitudes. Computing them in float32
+    # streams a quarter of the bytes of the complex128 stft through
+    # biased_binary_mask. Writing the magnitudes directly to a float32
+    # array avoids a float64 intermediate.
+    magnitudes = np.abs(
+        images, out=np.empty(images.shape, np.float32), casting='same_kind')
+    target_mask, noise_mask = biased_binary_mask(magnitudes)
+    # asarray does not copy, if the masks are already float32
+    net_input['speech_mask_target'] = np.asarray(target_mask, np.float32)
+    net_input['noise_mask_target'] = np.asarray(noise_mask, np.float32)
     return net_input
 
 
-def get_train_dataset(database: JsonDatabase):
+class CachedFeatures:
+    """Cache the output of `prepare_data` as npy files.
+
+    The features of each example are stored in
+    `<cache_dir>/<example_id>/<key>.npy` and loaded memory-mapped, once they
+    are newer than all audio files of the example. Hence, the audio files
+    are only read and the masks are only computed in the first epoch.
+    """
+    keys = ['observation', 'speech_mask_target', 'noise_mask_target']
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir).expanduser().resolve()
+
+    def __call__(self, example):
+        example_dir = self.cache_dir / example['example_id']
+        source_mtime = max(
+            Path(audio).stat().st_mtime
+            for key in ['observation', 'speech_image', 'noise_image']
+            for audio in example['audio_path'][key]
+        )
+        try:
+            if all(
+                    (example_dir / f'{key}.npy').stat().st_mtime >= source_mtime
+                    for key in self.keys
+            ):
+                # mmap_mode='c' (copy-on-write) returns writable arrays,
+                # which are required by torch.from_numpy.
+                return {
+                    key: np.load(example_dir / f'{key}.npy', mmap_mode='c')
+                    for key in self.keys
+                }
+        except FileNotFoundError:
+            pass
+
+        net_input = prepare_data(example)
+        example_dir.mkdir(parents=True, exist_ok=True)
+        for key in self.keys:
+            # Write to a temporary file and rename it, so that a concurrent
+            # worker never reads a partially written file.
+            tmp_path = example_dir / f'{key}.{os.getpid()}.npy'
+            np.save(tmp_path, net_input[key])
+            os.replace(tmp_path, example_dir / f'{key}.npy')
+        return net_input
+
+
+def get_preprocessing(feature_cache_dir=None):
+    if feature_cache_dir is None:
+        return prepare_data
+    else:
+        return CachedFeatures(feature_cache_dir)
+
+
+def get_train_dataset(database: JsonDatabase, feature_cache_dir=None):
     train_ds = database.get_dataset('tr05_simu')
     return (train_ds
-            .map(prepare_data)
+            .map(get_preprocessing(feature_cache_dir))
             .prefetch(num_workers=4, buffer_size=4))
 
 
-def get_validation_dataset(database: JsonDatabase):
+def get_validation_dataset(database: JsonDatabase, feature_cache_dir=None):
     # AudioReader is a specialized function to read audio organized
     # in a json as described in pb.database.database
     val_iterator = database.get_dataset('dt05_simu')
-    return val_iterator.map(prepare_data) \
+    return val_iterator.map(get_preprocessing(feature_cache_dir)) \
         .prefetch(num_workers=4, buffer_size=4)
 
 
 @ex.command
-def test_run(storage_dir, database_json):
+def test_run(storage_dir, database_json, feature_cache_dir):
     model = SimpleMaskEstimator(513)
     print(f'Simple training for the following model: {model}')
     database = JsonDatabase(database_json)
-    train_dataset = get_train_dataset(database)
-    validation_dataset = get_validation_dataset(database)
+    train_dataset = get_train_dataset(database, feature_cache_dir)
+    validation_dataset = get_validation_dataset(database, feature_cache_dir)
     trainer = pt.train.trainer.Trainer(
         model, storage_dir, optimizer=pt.train.optimizer.Adam(),
         stop_trigger=(int(1e5), 'iteration')
@@ -88,12 +154,12 @@ def test_run(storage_dir, database_json):
 
 
 @ex.automain
-def train(storage_dir, database_json):
+def train(storage_dir, database_json, feature_cache_dir):
     model = SimpleMaskEstimator(513)
     print(f'Simple training for the following model: {model}')
     database = JsonDatabase(database_json)
-    train_dataset = get_train_dataset(database)
-    validation_dataset = get_validation_dataset(database)
+    train_dataset = get_train_dataset(database, feature_cache_dir)
+    validation_dataset = get_validation_dataset(database, feature_cache_dir)
     trainer = pt.Trainer(model, storage_dir,
                          optimizer=pt.train.optimizer.Adam(),
                          stop_trigger=(int(1e5), 'iteration'))
@@ -37,13 +37,13 @@ class Classifier(Model):
             targets = targets.unsqueeze(-1)  # add time axis
             targets = targets.expand((targets.shape[0], logits.shape[-1]))
         predictions = torch.argmax(logits, dim=1)
-        ce = torch.nn.CrossEntropyLoss(reduction='none')(logits, targets)
+        ce = torch.nn.functional.cross_entropy(logits, targets, reduction='none')
         ce = Mean(axis=-1)(ce, seq_len)
         return dict(
             loss=ce.mean(),
-            scalars=dict(
-                predictions=predictions,
-                targets=targets,
+            buffers=dict(
+                predictions=predictions.cpu().numpy(),
+                targets=targets.cpu().numpy(),
             ),
             histograms=dict(
                 ce_=ce.flatten(),
@@ -55,18 +55,24 @@ class Classifier(Model):
         )
 
     def modify_summary(self, summary):
-        if 'targets' in summary['scalars']:
-            targets = summary['scalars'].pop('targets')
-            predictions = summary['scalars'].pop('predictions')
-            summary['scalars']['accuracy'] = (
-                np.array(predictions) == np.array(targets)
-            ).mean()
+        if 'targets' in summary['buffers']:
+            # One array per step, the time axis may differ between steps
+            targets = np.concatenate([
+                t.ravel() for t in summary['buffers'].pop('targets')
+            ])
+            predictions = np.concatenate([
+                p.ravel() for p in summary['buffers'].pop('predictions')
+            ])
+            summary['scalars']['accuracy'] = (predictions == targets).mean()
         for key, image in summary['images'].items():
             if image.dim() == 3:
                 image = image.unsqueeze(1)
-            summary['images'][key] = make_grid(
-                image.flip(2),  normalize=True, scale_each=False, nrow=1
-            )
+            # flip copies the images, hence they can be normalized in-place
+            # instead of letting make_grid(normalize=True) clone them again
+            image = image.flip(2)
+            low, high = image.min(), image.max()
+            image.sub_(low).div_(torch.clamp(high - low, min=1e-5))
+            summary['images'][key] = make_grid(image, nrow=1)
         summary = super().modify_summary(summary)
         return summary
 
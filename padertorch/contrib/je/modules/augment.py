@@ -250,8 +250,10 @@ class AdditiveNoise(nn.Module):
     def forward(self, x):
         if self.training:
             B = x.shape[0]
-            scale = torch.rand(B).to(x.device) * self.max_scale
-            x = x + scale[(...,) + (x.dim()-1)*(None,)] * torch.randn_like(x)
+            scale = torch.rand(B, device=x.device) * self.max_scale
+            x = torch.addcmul(
+                x, scale[(...,) + (x.dim()-1)*(None,)], torch.randn_like(x)
+            )
         return x
 
 
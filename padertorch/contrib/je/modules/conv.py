@@ -171,7 +171,10 @@ class _Conv(Module):
         if not self.is_transpose():
             x = self.pad(x)
 
-        y = self.conv(x)
+        if self.gated:
+            y, g = self._gated_conv(x)
+        else:
+            y = self.conv(x)
         if sequence_lengths is not None:
             sequence_lengths = self.get_output_sequence_lengths(sequence_lengths)
 
@@ -180,7 +183,6 @@ class _Conv(Module):
                 y = self.norm(y, sequence_lengths=sequence_lengths)
             y = self.activation_fn(y)
         if self.gated:
-            g = self.gate_conv(x)
             y = y * torch.sigmoid(g)
 
         if self.is_transpose():
@@ -188,6 +190,28 @@ class _Conv(Module):
 
         return y, sequence_lengths
 
+    def _gated_conv(self, x):
+        """Output and gate of a gated convolution with a single convolution
+        over the stacked weights, which reads x only once.
+        """
+        # The output channels are axis 0 of conv weights and axis 1 of
+        # transposed conv weights.
+        weight = torch.cat(
+            (self.conv.weight, self.gate_conv.weight),
+            dim=int(self.is_transpose())
+        )
+        bias = None if self.conv.bias is None else torch.cat(
+            (self.conv.bias, self.gate_conv.bias)
+        )
+        if self.is_transpose():
+            conv_fn = F.conv_transpose2d if self.is_2d() else F.conv_transpose1d
+        else:
+            conv_fn = F.conv2d if self.is_2d() else F.conv1d
+        return conv_fn(
+            x, weight, bias, stride=self.conv.stride,
+            dilation=self.conv.dilation,
+        ).chunk(2, dim=1)
+
     def pad(self, x):
         """
         adds padding
@@ -407,6 +431,7 @@ class _CNN(Module):
             pool_size=1,
             pool_stride=None,
             return_pool_indices=False,
+            channels_last=False,
     ):
         """
 
@@ -445,6 +470,10 @@ class _CNN(Module):
             pool_type:
             pool_size:
             return_pool_indices:
+            channels_last: if True (2d only), the weights and activations
+                use the channels_last memory format, for which cudnn has the
+                faster (NHWC) convolution kernels, in particular with mixed
+                precision.
         """
         super().__init__()
 
@@ -572,6 +601,11 @@ class _CNN(Module):
             self.output_activation_fn = None
         self.reset_parameters()
 
+        assert not channels_last or self.is_2d(), channels_last
+        self.channels_last = channels_last
+        if channels_last:
+            self.to(memory_format=torch.channels_last)
+
     def reset_parameters(self):
         if isinstance(self.input_activation_fn, torch.nn.PReLU):
             with torch.no_grad():
@@ -643,6 +677,8 @@ class _CNN(Module):
             ).all(), (sequence_lengths, expected_sequence_lengths)
         else:
             output_sequence_lengths = None
+        if self.channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
         pool_indices = to_list(copy(pool_indices), self.num_layers)[::-1]
         skip_signals = []
         for i, conv in enumerate(self.convs):
@@ -811,7 +847,8 @@ class _CNN(Module):
             else:
                 transpose_config[kw] = config[kw]
         for kw in [
-            'activation_fn', 'pre_activation', 'dropout', 'gated', 'norm_kwargs'
+            'activation_fn', 'pre_activation', 'dropout', 'gated', 'norm_kwargs',
+            'channels_last',
         ]:
             if kw not in config.keys():
                 continue
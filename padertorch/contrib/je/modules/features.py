@@ -2,7 +2,7 @@ from typing import Optional
 
 import numpy as np
 import torch
-from paderbox.transform.module_fbank import get_fbanks
+from paderbox.transform.module_fbank import get_fbanks, hz2bin, hz2mel, mel2hz
 from paderbox.utils.random_utils import TruncatedExponential
 from padertorch.base import Module
 from padertorch.contrib.je.modules.augment import (
@@ -14,6 +14,17 @@ from scipy.signal import savgol_coeffs
 from padertorch.ops.sequence.mask import compute_mask
 
 
+def _power_mel_log(
+        stft: torch.Tensor, fbanks: torch.Tensor, eps: float, log: bool
+) -> torch.Tensor:
+    # einsum computes the power without a squared copy of the stft.
+    # Fusion of the element-wise ops is left to the opt-in compile=True.
+    x = torch.einsum('...i,...i->...', stft, stft) @ fbanks
+    if log:
+        x = torch.log(x + eps)
+    return x
+
+
 class NormalizedLogMelExtractor(nn.Module):
     """
     >>> x = torch.randn((10,1,100,257,2))
@@ -38,6 +49,7 @@ class NormalizedLogMelExtractor(nn.Module):
             n_time_masks=0, max_masked_time_steps=70, max_masked_time_rate=.2,
             n_frequency_masks=0, max_masked_frequency_bands=20, max_masked_frequency_rate=.2,
             max_noise_scale=0.,
+            compile=False,
     ):
         super().__init__()
         self.mel_transform = MelTransform(
@@ -62,7 +74,12 @@ class NormalizedLogMelExtractor(nn.Module):
         assert all([len(pair) == 2 for pair in ipd_pairs]), ipd_pairs
         assert all([c < num_channels for pair in ipd_pairs for c in pair]), ipd_pairs
         self.ipd_pairs = list(zip(*ipd_pairs))
-        self.filter_max_indices = self.mel_transform.fbanks.argmax(0)
+        # A buffer, so that it is moved to the device with the module and
+        # the indexing below does not copy the indices in every call
+        self.register_buffer(
+            'filter_max_indices', self.mel_transform.fbanks.argmax(0),
+            persistent=False,
+        )
         norm_cls = Normalization if batch_norm else InputNormalization
         self.norm = norm_cls(
             data_format='bcft',
@@ -139,6 +156,13 @@ class NormalizedLogMelExtractor(nn.Module):
         else:
             self.noise = None
 
+        if compile and hasattr(self, 'compile'):
+            # In-place compile (torch >= 2.2) fuses the chain of small
+            # element-wise ops. dynamic=True avoids recompilations for
+            # varying batch sizes and sequence lengths. The state dict keys
+            # are unchanged.
+            self.compile(dynamic=True)
+
     def forward(self, x, seq_len=None, targets=None):
         with torch.no_grad():
             if self.scale is not None:
@@ -150,8 +174,8 @@ class NormalizedLogMelExtractor(nn.Module):
                 )
 
             if self.ipd_pairs:
-                x_re = x[..., self.filter_max_indices, 0]
-                x_im = x[..., self.filter_max_indices, 1]
+                # A single gather for the real and imaginary part
+                x_re, x_im = x[..., self.filter_max_indices, :].unbind(-1)
                 channel_ref, channel_other = self.ipd_pairs
                 ipds = torch.atan2(
                     x_im[:, channel_other] * x_re[:, channel_ref]
@@ -161,7 +185,7 @@ class NormalizedLogMelExtractor(nn.Module):
                 ).transpose(-2, -1)
             else:
                 ipds = None
-            x = self.mel_transform(torch.sum(x**2, dim=(-1,))).transpose(-2, -1)
+            x = self.mel_transform.forward_stft(x).transpose(-2, -1)
 
             if self.time_warping is not None:
                 x, seq_len = self.time_warping(x, seq_len=seq_len)
@@ -288,8 +312,33 @@ class MelTransform(Module):
             htk_mel=htk_mel,
         ).astype(np.float32)
         fbanks = fbanks / (fbanks.sum(axis=-1, keepdims=True) + 1e-6)
+        # fbanks.T is only a view, store a contiguous copy for the matmuls
         self.fbanks = nn.Parameter(
-            torch.from_numpy(fbanks.T), requires_grad=False
+            torch.from_numpy(np.ascontiguousarray(fbanks.T)),
+            requires_grad=False
+        )
+        # The static fbanks are frozen, hence the (normalized) pseudo inverse
+        # is computed only once. Not persistent to keep the state dict
+        # compatible with existing checkpoints.
+        ifbanks = fbanks / (fbanks.sum(axis=0, keepdims=True) + 1e-6)
+        self.register_buffer(
+            '_ifbanks', torch.from_numpy(ifbanks), persistent=False
+        )
+        # The warping only moves these (unwarped) corner frequencies of the
+        # filters, see get_fbanks.
+        highest_frequency = (
+            sample_rate / 2 if highest_frequency is None
+            else highest_frequency
+        )
+        if highest_frequency < 0:
+            highest_frequency = highest_frequency % sample_rate / 2
+        self._frequencies = mel2hz(
+            np.linspace(
+                hz2mel(lowest_frequency, htk_mel=htk_mel),
+                hz2mel(highest_frequency, htk_mel=htk_mel),
+                number_of_filters + 2
+            ),
+            htk_mel=htk_mel,
         )
 
     def forward(self, x, return_maxima=False):
@@ -303,18 +352,7 @@ class MelTransform(Module):
                 x.shape[i] if i in independent_axis else 1
                 for i in range(x.ndim-1)
             ]
-            fbanks = get_fbanks(
-                sample_rate=self.sample_rate,
-                stft_size=self.stft_size,
-                number_of_filters=self.number_of_filters,
-                lowest_frequency=self.lowest_frequency,
-                highest_frequency=self.highest_frequency,
-                htk_mel=self.htk_mel,
-                warping_fn=self.warping_fn,
-                size=size,
-            ).astype(np.float32)
-            fbanks = fbanks / (fbanks.sum(axis=-1, keepdims=True) + 1e-6)
-            fbanks = torch.from_numpy(fbanks).transpose(-2, -1).to(x.device)
+            fbanks = self._get_warped_fbanks(size, x.device)
             if fbanks.shape[-3] == 1:
                 x = x.matmul(fbanks.squeeze(-3))
             else:
@@ -326,14 +364,51 @@ class MelTransform(Module):
             return x, maxima
         return x
 
+    def _get_warped_fbanks(self, size, device):
+        """Same as get_fbanks with warping_fn (normalized and transposed),
+        but the filters are constructed on the device. Only the warped
+        corner frequencies, with shape (*size, number_of_filters + 2), are
+        computed with numpy and copied to the device, not the filters.
+        """
+        k = hz2bin(
+            self.warping_fn(self._frequencies, size=size),
+            self.sample_rate, self.stft_size,
+        )
+        k = torch.as_tensor(k, device=device)
+        centers = k[..., 1:-1, None]
+        onsets = torch.minimum(k[..., :-2, None], centers - 1)
+        offsets = torch.maximum(k[..., 2:, None], centers + 1)
+        idx = torch.arange(
+            self.stft_size // 2 + 1, dtype=k.dtype, device=device
+        )
+        fbanks = torch.minimum(
+            (idx - onsets) / (centers - onsets),
+            (idx - offsets) / (centers - offsets),
+        ).clamp_min(0).float()
+        fbanks = fbanks / (fbanks.sum(dim=-1, keepdim=True) + 1e-6)
+        fbanks = fbanks.broadcast_to((*size, *fbanks.shape[-2:]))
+        return fbanks.transpose(-2, -1).contiguous()
+
+    def forward_stft(self, x):
+        """Like forward, but takes a stft with real and imaginary part
+        stacked in the last axis instead of the power spectrogram.
+
+        >>> mel_transform = MelTransform(16000, 512, 40)
+        >>> x = torch.randn((3, 1, 100, 257, 2))
+        >>> y = mel_transform.forward_stft(x)
+        >>> y.shape
+        torch.Size([3, 1, 100, 40])
+        >>> torch.testing.assert_close(y, mel_transform(torch.sum(x**2, -1)))
+        """
+        if self.training and self.warping_fn is not None:
+            return self(torch.einsum('...i,...i->...', x, x))
+        return _power_mel_log(x, self.fbanks, self.eps, self.log)
+
     def inverse(self, x):
         """Invert the mel-filterbank transform."""
-        ifbanks = self.fbanks.T
-        ifbanks = ifbanks / (ifbanks.sum(dim=-2, keepdim=True) + 1e-6)
         if self.log:
             x = torch.exp(x)
-        x = x @ ifbanks
-        return torch.max(x, torch.zeros_like(x))
+        return torch.clamp_min(x @ self._ifbanks, 0.)
 
 
 class DeltaExtractor(nn.Module):
@@ -369,20 +444,27 @@ class DeltaExtractor(nn.Module):
         )
 
     def forward(self, x, seq_len=None):
-        # pack batch
-        shape = x.size()
-        x = x.reshape(1, -1, shape[-1])
-
         assert self.width >= 3, self.width
         n = (self.width - 1) // 2
 
-        kernel = self.kernel.repeat(x.shape[1], 1, 1)
-        y = torch.nn.functional.conv1d(x, kernel, groups=x.shape[1])
+        y = _correlate_valid(x, self.kernel)
         y = torch.nn.functional.pad(y, [n, n], mode="constant")
 
-        # unpack batch
-        y = y.reshape(shape)
         if seq_len is not None:
             y = y * compute_mask(y, np.array(seq_len) - n, batch_axis=0, sequence_axis=-1)
 
         return y
+
+
+def _correlate_valid(x: torch.Tensor, kernel: torch.Tensor) -> torch.Tensor:
+    """Same as a grouped conv1d with the kernel shared by all channels, but
+    as a weighted sum of shifted slices of the last axis. For the few taps
+    of the delta kernels this avoids the per call kernel expansion and the
+    slow grouped convolution.
+    """
+    width = kernel.shape[0]
+    frames = x.shape[-1] - width + 1
+    y = kernel[0] * x[..., :frames]
+    for i in range(1, width):
+        y = y + kernel[i] * x[..., i:i + frames]
+    return y
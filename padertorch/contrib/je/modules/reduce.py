@@ -110,5 +110,5 @@ class AutoPool(nn.Module):
             seq_len = torch.Tensor(seq_len).to(x.device)[:, None, None]
             mask = (torch.cumsum(torch.ones_like(x_), dim=-1) <= seq_len).float()
             x_ = x_ * mask + torch.log(mask)
-        weights = nn.Softmax(dim=-1)(x_)
+        weights = torch.softmax(x_, dim=-1)
         return (weights*x).sum(dim=-1)
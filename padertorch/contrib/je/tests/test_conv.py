@@ -206,6 +206,27 @@ def test_cnn_2d():
         )
 
 
+def test_cnn_2d_channels_last():
+    x = torch.randn((4, 3, 40, 100))
+    kwargs = dict(
+        in_channels=3, out_channels=[16, 16, 10], kernel_size=3,
+        norm='batch', pool_size=[1, 2, 1],
+    )
+    cnn = CNN2d(**kwargs).eval()
+    cnn_channels_last = CNN2d(**kwargs, channels_last=True).eval()
+    cnn_channels_last.load_state_dict(cnn.state_dict())
+    assert cnn_channels_last.convs[0].conv.weight.is_contiguous(
+        memory_format=torch.channels_last
+    )
+    y, seq_len = cnn(x, 4*[100])
+    y_channels_last, seq_len_channels_last = cnn_channels_last(x, 4*[100])
+    np.testing.assert_allclose(
+        y_channels_last.detach().numpy(), y.detach().numpy(),
+        rtol=1e-4, atol=1e-5
+    )
+    assert (np.array(seq_len) == np.array(seq_len_channels_last)).all()
+
+
 def test_resnet_1d():
     for num_frames in [1025]:
         x = get_input_1d(num_frames)
@@ -1,4 +1,3 @@
-import einops
 import torch
 from torch.nn.utils.rnn import PackedSequence
 
@@ -12,7 +11,9 @@ class DeepClusteringModel(pt.Model):
             recurrent_layers=2,
             units=600,
             E=20,
-            input_feature_transform='identity'
+            input_feature_transform='identity',
+            compile=False,
+            autocast=False,
     ):
         """
 
@@ -24,15 +25,31 @@ class DeepClusteringModel(pt.Model):
             recurrent_layers:
             units: results in `units` forward and `units` backward units
             E: Dimensionality of the embedding
+            compile: If True, compile the input transform and the dense part
+                after the LSTM with `torch.compile` (torch >= 2.0) to fuse
+                the pointwise ops.
+            autocast: If True, the BLSTM and the dense layers run in bfloat16
+                autocast. The output and the losses stay in float32.
         """
         super().__init__()
         self.E = E
         self.F = F
+        if input_feature_transform not in ['identity', 'log1p', 'log']:
+            raise NotImplementedError(input_feature_transform)
         self.input_feature_transform = input_feature_transform
         self.blstm = torch.nn.LSTM(
             F, units, recurrent_layers, bidirectional=True
         )
         self.linear = torch.nn.Linear(2 * units, F * E)
+        self.autocast = autocast
+        if compile and hasattr(torch, 'compile'):
+            # The PackedSequence handling stays outside the compiled region,
+            # the batch_sizes manipulation would cause graph breaks.
+            # With automatic dynamic shapes only the packed time axis becomes
+            # dynamic after the first recompilation, while the feature sizes
+            # (units, E and F) stay static and specialize the kernels.
+            self._embed = torch.compile(self._embed)
+            self._transform_input = torch.compile(self._transform_input)
 
     def forward(self, batch):
         """
@@ -45,40 +62,98 @@ class DeepClusteringModel(pt.Model):
         """
 
         h = pt.ops.pack_sequence(batch['Y_abs'])
+        # The pointwise ops work on the packed data, only the LSTM and the
+        # unpacking need the batch_sizes.
+        batch_sizes = h.batch_sizes
+        h_data = self._transform_input(h.data)
 
-        if self.input_feature_transform == 'identity':
-            pass
-        elif self.input_feature_transform == 'log1p':
+        _, F = h_data.size()
+        assert F == self.F, f'self.F = {self.F} != F = {F}'
+
+        # The weights of the replicas of DataParallel are not in a single
+        # contiguous chunk, which forces cuDNN to copy them in every call.
+        # This is a no-op, when the weights are already contiguous.
+        self.blstm.flatten_parameters()
+
+        # Packing and unpacking stay outside of the autocast region.
+        with torch.autocast(
+                device_type=h_data.device.type, dtype=torch.bfloat16,
+                enabled=self.autocast,
+        ):
+            # Returns tensor with shape (t, b, num_directions * hidden_size)
+            h, _ = self.blstm(PackedSequence(h_data, batch_sizes))
+            embedding_data = self._embed(h.data)
+
+        embedding = PackedSequence(embedding_data.float(), batch_sizes)
+        embedding = pt.ops.unpack_sequence(embedding)
+        return embedding
+
+    def _transform_input(self, h_data):
+        """Applies the `input_feature_transform` to the packed data."""
+        if self.input_feature_transform == 'log1p':
             # This is equal to the mu-law for mu=1.
-            h = pt.ops.sequence.log1p(h)
+            return torch.log1p(h_data)
         elif self.input_feature_transform == 'log':
-            h = PackedSequence(h.data + 1e-10, h.batch_sizes)
-            h = pt.ops.sequence.log(h)
+            return torch.log(h_data + 1e-10)
         else:
-            raise NotImplementedError(self.input_feature_transform)
-
-        _, F = h.data.size()
-        assert F == self.F, f'self.F = {self.F} != F = {F}'
-
-        # Returns tensor with shape (t, b, num_directions * hidden_size)
-        h, _ = self.blstm(h)
+            return h_data
 
-        h = PackedSequence(self.linear(h.data), h.batch_sizes)
-        h_data = einops.rearrange(h.data, 'tb (e f) -> tb e f', e=self.E)
+    def _embed(self, h_data):
+        """Dense part of forward, maps the LSTM output to the embeddings."""
+        h_data = self.linear(h_data)
+        h_data = h_data.unflatten(-1, (self.E, self.F))
 
         # Hershey 2016 page 2 top right paragraph: Unit norm
-        h_data = torch.nn.functional.normalize(h_data, dim=-2)
-
-        embedding = PackedSequence(h_data, h.batch_sizes,)
-        embedding = pt.ops.unpack_sequence(embedding)
-        return embedding
+        # Same as torch.nn.functional.normalize(h_data, dim=-2), but a
+        # multiplication with rsqrt of the squared norm instead of a division
+        # by the clamped norm. The clamp value is the squared default eps.
+        return h_data * torch.rsqrt(torch.clamp_min(
+            torch.sum(h_data ** 2, dim=-2, keepdim=True), 1e-24))
 
     def review(self, batch, model_out):
-        dc_loss = list()
-        for embedding, target_mask in zip(model_out, batch['target_mask']):
-            dc_loss.append(pt.ops.losses.deep_clustering_loss(
-                einops.rearrange(embedding, 't e f -> (t f) e'),
-                einops.rearrange(target_mask, 't k f -> (t f) k')
-            ))
-
-        return {'losses': {'dc_loss': torch.mean(torch.stack(dc_loss))}}
+        # All utterances are processed at once. The padded frames of the
+        # embeddings and the target masks are zero, hence they do not
+        # contribute to the affinities.
+        num_frames = torch.tensor(
+            [embedding.shape[0] for embedding in model_out],
+            device=model_out[0].device,
+        )
+        # 'b t e f -> b (t f) e' and 'b t k f -> b (t f) k'
+        embedding = pt.pad_sequence(model_out, batch_first=True)
+        embedding = embedding.transpose(-2, -1).flatten(1, 2)
+        target_mask = pt.pad_sequence(batch['target_mask'], batch_first=True)
+        target_mask = target_mask.transpose(-2, -1).flatten(1, 2)
+
+        dc_loss = _deep_clustering_loss(
+            embedding, target_mask, num_frames * self.F)
+        return {'losses': {'dc_loss': dc_loss}}
+
+
+def _deep_clustering_loss(x, t, num_bins):
+    """Batched version of `pt.ops.losses.deep_clustering_loss`.
+
+    Args:
+        x: Zero padded embeddings with shape (B, N, E).
+        t: Zero padded target masks with shape (B, N, K).
+        num_bins: Number of valid time frequency bins of each utterance,
+            shape (B,).
+
+    Returns:
+        The mean over the utterances of the loss of each utterance.
+
+    >>> x = torch.nn.functional.normalize(torch.rand(2, 6, 3), dim=-1)
+    >>> t = torch.rand(2, 6, 2)
+    >>> x[1, 4:] = t[1, 4:] = 0
+    >>> expected = torch.stack([
+    ...     pt.ops.losses.deep_clustering_loss(x[0], t[0]),
+    ...     pt.ops.losses.deep_clustering_loss(x[1, :4], t[1, :4]),
+    ... ]).mean()
+    >>> torch.allclose(
+    ...     _deep_clustering_loss(x, t, torch.tensor([6, 4])), expected)
+    True
+    """
+    return torch.mean((
+        torch.sum(torch.einsum('bne,bnE->beE', x, x) ** 2, dim=(-2, -1))
+        - 2 * torch.sum(torch.einsum('bne,bnK->beK', x, t) ** 2, dim=(-2, -1))
+        + torch.sum(torch.einsum('bnk,bnK->bkK', t, t) ** 2, dim=(-2, -1))
+    ) / num_bins ** 2)
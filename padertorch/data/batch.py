@@ -8,6 +8,7 @@ import paderbox as pb
 
 __all__ = [
     'example_to_device',
+    'example_to_pinned_memory',
     'example_to_numpy',
     'Sorter',
 ]
@@ -18,6 +19,8 @@ def example_to_device(example, device=None, memo=None):
     Moves a nested structure to the device.
     Numpy arrays are converted to `torch.Tensor`. Complex numpy arrays are
     converted if supported by the used torch version.
+    The transfer from the host to a gpu is non-blocking, i.e., asynchronous
+    for tensors in pinned memory.
 
     >>> import torch, numpy as np
     >>> example_to_device(np.ones(5, dtype=np.float32))
@@ -74,7 +77,63 @@ def example_to_device(example, device=None, memo=None):
                 if value.dtype not in [np.complex64, np.complex128]:
                     raise
         if isinstance(value, torch.Tensor):
-            value = value.to(device=device)
+            # A copy from the host to the device can be asynchronous: the
+            # kernels that use the tensor are launched on the same stream,
+            # hence they wait for the copy. A copy to the host must be
+            # synchronous, because the host may read it immediately.
+            value = value.to(
+                device=device, non_blocking=value.device.type == 'cpu')
+        memo[id_] = value
+        return value
+
+    return pb.utils.nested.nested_op(convert, example, handle_dataclass=True)
+
+
+def example_to_pinned_memory(example, memo=None):
+    """
+    Copies the numpy arrays and cpu tensors of a nested structure to
+    page-locked (pinned) host memory. Requires cuda.
+
+    From pinned memory, `example_to_device` copies asynchronously to the gpu,
+    i.e. the host can launch the next kernels, while the example is
+    transferred. A non-blocking copy from pageable memory instead blocks the
+    host, while cuda stages the data.
+    The caching host allocator of torch reuses the pinned blocks, once the
+    tensors are released and the copies are finished. Hence, there is no
+    page-locking of new memory in each step.
+
+    Use it in the data pipeline with a thread based prefetch, e.g.
+    `dataset.map(example_to_pinned_memory).prefetch(4, 8)`, or with
+    `Trainer(..., pin_memory=True)`. Tensors that are already pinned are not
+    copied again.
+
+    >>> example_to_pinned_memory({'signal': np.ones(5, dtype=np.float32)})  # doctest: +SKIP
+    {'signal': tensor([1., 1., 1., 1., 1.])}
+
+    Args:
+        example:
+        memo: See `copy.deepcopy`
+
+    Returns:
+        example, where the arrays are replaced by pinned tensors
+    """
+    if memo is None:
+        memo = {}
+
+    def convert(value):
+        id_ = id(value)
+        if id_ in memo:
+            return memo[id_]
+
+        if isinstance(value, np.ndarray):
+            try:
+                value = torch.from_numpy(value)
+            except TypeError:
+                # e.g. object or str arrays
+                pass
+        if isinstance(value, torch.Tensor) \
+                and value.device.type == 'cpu' and not value.is_pinned():
+            value = value.pin_memory()
         memo[id_] = value
         return value
 
@@ -142,6 +201,10 @@ class Sorter:
         >>> Sorter('value')(batch)
         ({'value': 5}, {'value': 3}, {'value': 2}, {'value': 1})
 
+        The input is not modified:
+        >>> batch
+        [{'value': 5}, {'value': 1}, {'value': 3}, {'value': 2}]
+
     Attributes:
         key: Key to sort by
         reverse: If `True`, sorts in reverse order. The default `True` is
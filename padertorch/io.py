@@ -176,3 +176,37 @@ def loads_config(
         return loads_yaml(content)
     else:
         raise NotImplementedError(format)
+
+
+def load_checkpoint(
+        checkpoint_path,
+        map_location='cpu',
+):
+    """
+    `torch.load` with memory-mapped tensor storages, if possible. Then the
+    file is not read into memory before the tensors are created.
+
+    mmap requires the zipfile format (default since torch 1.6) and
+    torch >= 2.1. Otherwise, the checkpoint is loaded without mmap.
+
+    >>> import tempfile, torch
+    >>> with tempfile.TemporaryDirectory() as tmp_dir:
+    ...     for zipfile in [True, False]:
+    ...         path = Path(tmp_dir) / 'ckpt.pth'
+    ...         torch.save({'a': torch.ones(2)}, path,
+    ...                    _use_new_zipfile_serialization=zipfile)
+    ...         print(load_checkpoint(path))
+    {'a': tensor([1., 1.])}
+    {'a': tensor([1., 1.])}
+    """
+    import torch
+    with open(checkpoint_path, 'rb') as fd:
+        is_zipfile = torch.serialization._is_zipfile(fd)
+    if is_zipfile:
+        try:
+            return torch.load(
+                checkpoint_path, map_location=map_location, mmap=True)
+        except TypeError:
+            # torch < 2.1 has no mmap argument
+            pass
+    return torch.load(checkpoint_path, map_location=map_location)
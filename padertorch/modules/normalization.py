@@ -149,6 +149,7 @@ class Normalization(Module):
             self.beta = None
 
         self.frozen = False
+        self._running_std_cache = None
 
     @property
     def running_var(self):
@@ -163,7 +164,39 @@ class Normalization(Module):
         assert (running_var >= 0).all(), running_var.min()
         return running_var
 
+    @property
+    def running_std(self):
+        """sqrt(running_var + eps), which is used to (de)normalize.
+
+        The value is cached until the running statistics are updated, reset,
+        loaded or moved (see `_invalidate_running_std`), so that the
+        running_var (including its check, which synchronizes with the
+        device) is not recomputed in every forward call in eval mode.
+        Call `_invalidate_running_std`, when you change the running
+        statistics manually.
+        """
+        if self._running_std_cache is not None:
+            return self._running_std_cache
+        running_std = torch.sqrt(self.running_var.detach() + self.eps)
+        if not torch.is_inference_mode_enabled():
+            # Inference tensors cannot be used in autograd later
+            self._running_std_cache = running_std
+        return running_std
+
+    def _invalidate_running_std(self):
+        self._running_std_cache = None
+
+    def _apply(self, *args, **kwargs):
+        # e.g. .to(), .cuda() and .double() replace the buffers
+        self._invalidate_running_std()
+        return super()._apply(*args, **kwargs)
+
+    def _load_from_state_dict(self, *args, **kwargs):
+        self._invalidate_running_std()
+        return super()._load_from_state_dict(*args, **kwargs)
+
     def reset_running_stats(self):
+        self._invalidate_running_std()
         if self.track_running_stats:
             self.num_tracked_values.zero_()
             if self.shift:
@@ -205,6 +238,7 @@ class Normalization(Module):
         return x
 
     def _update_running_stats(self, mean, power, n_values):
+        self._invalidate_running_std()
         self.num_tracked_values += n_values.detach()
         if self.momentum is None:
             momentum = 1 - n_values / self.num_tracked_values.detach()
@@ -221,7 +255,7 @@ class Normalization(Module):
         if self.shift:
             x = x - self.running_mean.detach()
         if self.scale:
-            x = x / torch.sqrt(self.running_var.detach() + self.eps)
+            x = x / self.running_std
         if self.gamma is not None:
             x = x * self.gamma
         if self.beta is not None:
@@ -237,9 +271,11 @@ class Normalization(Module):
             x = x - self.beta
         if self.gamma is not None:
             x = x / self.gamma
-        if self.scale:
-            x = torch.sqrt(self.running_var.detach() + self.eps) * x
-        if self.shift:
+        if self.scale and self.shift:
+            x = torch.addcmul(self.running_mean.detach(), self.running_std, x)
+        elif self.scale:
+            x = self.running_std * x
+        elif self.shift:
             x = x + self.running_mean.detach()
         x = x * compute_mask(
             x, sequence_lengths, self.batch_axis, self.sequence_axis
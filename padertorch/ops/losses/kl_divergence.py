@@ -1,5 +1,5 @@
+import torch
 from torch.distributions import Normal, MultivariateNormal
-from torch.distributions import kl_divergence as kld
 
 
 __all__ = [
@@ -14,17 +14,34 @@ def _batch_diag(bmat):
     return bmat.reshape(bmat.shape[:-2] + (-1,))[..., ::bmat.size(-1) + 1]
 
 
+def _tril_inverse(tril):
+    """
+    Returns the inverses of a batch of lower triangular matrices.
+    """
+    from distutils.version import LooseVersion
+    if LooseVersion(torch.__version__) < '1.11':
+        return tril.inverse()
+    # A triangular solve is cheaper than the LU based general inverse
+    eye = torch.eye(tril.shape[-1], dtype=tril.dtype, device=tril.device)
+    return torch.linalg.solve_triangular(
+        tril, eye.expand_as(tril), upper=False
+    )
+
+
 def gaussian_kl_divergence(q, p):
     """
     Args:
-        q: Normal posterior distributions (B1, ..., BN, D)
+        q: Normal posterior distributions (B1, ..., BN, D). Only q.loc and
+            q.scale are used, hence any object with these tensors works, so
+            that the posterior does not have to be a (validated) Normal in
+            the training loop.
         p: (Multivariate) Normal prior distributions (K1, ..., KN, D)
 
     Returns: kl between all posteriors in batch and all components
         (B1, ..., BN, K1, ..., KN)
 
     """
-    assert isinstance(q, Normal), type(q)
+    assert hasattr(q, 'loc') and hasattr(q, 'scale'), type(q)
     batch_shape = q.loc.shape[:-1]
     D = q.loc.shape[-1]
     component_shape = p.loc.shape[:-1]
@@ -40,7 +57,7 @@ def gaussian_kl_divergence(q, p):
             _batch_diag(p_scale_tril).log().sum(-1)[:, None]
             - q_scale.log().sum(-1)
         )
-        L = p_scale_tril.inverse()
+        L = _tril_inverse(p_scale_tril)
         term2 = (L.pow(2).sum(-2)[:, None, :] * q_scale.pow(2)).sum(-1)
         term3 = (
                 (p_loc[:, None, :] - q_loc) @ L.transpose(1, 2)
@@ -51,9 +68,11 @@ def gaussian_kl_divergence(q, p):
         q_loc = q.loc.contiguous().view(-1, 1, D)
         q_scale = q.scale.contiguous().view(-1, 1, D)
 
-        kl = kld(
-            Normal(loc=q_loc, scale=q_scale), Normal(loc=p_loc, scale=p_scale)
-        ).sum(-1)
+        # Closed form of kl_divergence(Normal, Normal) on the tensors,
+        # without building and validating broadcast Normal distributions
+        var_ratio = (q_scale / p_scale).pow(2)
+        t1 = ((q_loc - p_loc) / p_scale).pow(2)
+        kl = 0.5 * (var_ratio + t1 - 1 - var_ratio.log()).sum(-1)
     else:
         raise ValueError
 
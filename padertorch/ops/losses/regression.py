@@ -2,7 +2,9 @@ import torch
 
 
 def _sqnorm(x, dim=None, keepdim=False):
-    x = torch.abs(x)
+    # For real inputs abs would only be an additional full-size copy
+    if x.is_complex():
+        x = torch.abs(x)
     if dim is None:
         assert not keepdim
         return torch.sum(x * x)
@@ -11,7 +13,9 @@ def _sqnorm(x, dim=None, keepdim=False):
 
 
 def _mse(estimate, target, dim=None):
-    error = torch.abs(estimate - target)
+    error = estimate - target
+    if error.is_complex():
+        error = torch.abs(error)
     if dim is None:
         return torch.mean(error * error)
     else:
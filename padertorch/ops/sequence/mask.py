@@ -1,3 +1,4 @@
+import numpy as np
 import torch
 
 
@@ -60,8 +61,14 @@ def compute_mask(x, sequence_lengths, batch_axis=0, sequence_axis=1):
         batch_axis = x.dim() + batch_axis
     if sequence_axis < 0:
         sequence_axis = x.dim() + sequence_axis
-    if not torch.is_tensor(sequence_lengths):
-        sequence_lengths = torch.Tensor(sequence_lengths).long().to(x.device)
+    # torch.compile traces numpy arrays as tensors, hence the explicit check
+    if (
+            not torch.is_tensor(sequence_lengths)
+            or isinstance(sequence_lengths, np.ndarray)
+    ):
+        sequence_lengths = torch.as_tensor(
+            sequence_lengths, dtype=torch.long, device=x.device
+        )
     assert sequence_lengths.device == x.device, (sequence_lengths.device, x.device)
     for dim in range(batch_axis + 1, x.dim()):
         sequence_lengths = sequence_lengths.unsqueeze(-1)
@@ -18,12 +18,18 @@ __all__ = [
 
 
 def sequence_elementwise(function, x, *args, **kwargs):
-    """Expects the desired function and a `Tensor` or `PackedSequence`."""
+    """Expects the desired function and a `Tensor` or `PackedSequence`.
+
+    For a `PackedSequence` only the data is replaced, the `batch_sizes` and
+    the sort indices of an unsorted sequence are kept.
+
+    >>> from torch.nn.utils.rnn import pack_sequence
+    >>> x = pack_sequence([torch.ones(2), torch.ones(3)], enforce_sorted=False)
+    >>> exp(x)
+    PackedSequence(data=tensor([2.7183, 2.7183, 2.7183, 2.7183, 2.7183]), batch_sizes=tensor([2, 2, 1]), sorted_indices=tensor([1, 0]), unsorted_indices=tensor([1, 0]))
+    """
     if isinstance(x, torch.nn.utils.rnn.PackedSequence):
-        return torch.nn.utils.rnn.PackedSequence(
-            function(x.data, *args, **kwargs),
-            x.batch_sizes
-        )
+        return x._replace(data=function(x.data, *args, **kwargs))
     else:
         return function(x, *args, **kwargs)
 
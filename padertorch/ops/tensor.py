@@ -23,11 +23,7 @@ def move_axis(a: torch.Tensor, source: int, destination: int):
     >>> move_axis(x, -1, 0).size()
     torch.Size([5, 3, 4])
     """
-    source = source % len(a.size())
-    destination = destination % len(a.size())
-    permutation = [d for d in range(len(a.size())) if not d == source]
-    permutation.insert(destination, source)
-    return a.permute(permutation)
+    return torch.movedim(a, source, destination)
 
 
 def broadcast_to(tensor: torch.Tensor, shape):
@@ -55,15 +51,7 @@ def matrix_diag(x):
     torch.Size([3, 4, 4])
 
     """
-    if x.dim() == 1:
-        return torch.diag(x)
-    feature_dim = x.shape[-1]
-    mat = x.reshape((-1, feature_dim))
-
-    # TODO: Find a way to remove the python loop without the multiplication
-    #       with the eye matrix.
-    diags = torch.stack([torch.diag(vec) for vec in mat])
-    return diags.reshape((*x.shape, feature_dim))
+    return torch.diag_embed(x)
 
 
 def matrix_eye_like(x):
@@ -83,7 +71,7 @@ def matrix_eye_like(x):
 
     """
     feature_dim = x.shape[-1]
-    eye = torch.eye(feature_dim)
+    eye = torch.eye(feature_dim, dtype=x.dtype, device=x.device)
     if x.dim() == 1:
         return eye
     else:
@@ -91,8 +79,12 @@ def matrix_eye_like(x):
 
 
 def batch_tril(x):
-    """Apply torch.tril along the minibatch axis."""
-    matrix_dims = x.shape[-2:]
-    mats = x.reshape((-1, *matrix_dims))
-    trils = torch.stack([torch.tril(mat) for mat in mats])
-    return trils.reshape(x.shape)
+    """Apply torch.tril along the minibatch axis.
+
+    torch.tril supports leading batch dimensions, this is only kept as alias.
+
+    >>> batch_tril(torch.ones(3, 2, 2))[0]
+    tensor([[1., 0.],
+            [1., 1.]])
+    """
+    return torch.tril(x)
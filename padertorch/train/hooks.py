@@ -8,8 +8,10 @@ E.g., adding a learning rate schedule without adding further conditions to the
 trainer.
 
 """
+import functools
+import math
 import types
-from collections import defaultdict
+from collections import defaultdict, deque
 from enum import IntEnum
 from pathlib import Path
 
@@ -194,7 +196,10 @@ class SummaryHook(TriggeredHook):
         return types.MappingProxyType(dict(
             # losses=defaultdict(list),
             scalars=defaultdict(list),
-            histograms=defaultdict(list),
+            # Do not hold more than 1M values per histogram in memory. The
+            # deque drops the oldest values on extend, without copying the
+            # remaining values.
+            histograms=defaultdict(functools.partial(deque, maxlen=1000000)),
             audios=dict(),
             images=dict(),
             texts=dict(),
@@ -233,9 +238,6 @@ class SummaryHook(TriggeredHook):
             self.summary['scalars'][key].extend(self._to_list(scalars))
         for key, histogram in popped_review.pop('histograms', dict()).items():
             self.summary['histograms'][key].extend(self._to_list(histogram))
-            # do not hold more than 1M values in memory
-            self.summary['histograms'][key] = \
-                self.summary['histograms'][key][-1000000:]
         for key, buffer in popped_review.pop('buffers', dict()).items():
             self.summary['buffers'][key].append(self._detach(buffer))
         for key, snapshot in popped_review.pop('snapshots', dict()).items():
@@ -255,14 +257,30 @@ class SummaryHook(TriggeredHook):
     @staticmethod
     def _to_list(scalars):
         if torch.is_tensor(scalars):
-            scalars = scalars.clone().cpu().data.numpy()
+            # No clone necessary, tolist copies the values
+            scalars = scalars.detach().cpu().numpy()
         if isinstance(scalars, np.ndarray):
-            scalars = scalars.flatten().tolist()
+            scalars = scalars.ravel().tolist()
         if not isinstance(scalars, (list, tuple)):
             assert np.isscalar(scalars)
             scalars = [scalars]
         return scalars
 
+    def _histograms_to_list(self):
+        """
+        Converts the bounded deques of update_summary to lists, so that
+        modify_summary can slice and concatenate the histograms.
+
+        >>> hook = SummaryHook((1, 'epoch'))
+        >>> hook.update_summary({'histograms': {'a': [1, 2]}})
+        >>> hook._histograms_to_list()
+        >>> hook.summary['histograms']['a'][-1:] + [3]
+        [2, 3]
+        """
+        for key, histogram in self.summary['histograms'].items():
+            if isinstance(histogram, deque):
+                self.summary['histograms'][key] = list(histogram)
+
     @staticmethod
     def _detach(buffer):
         if torch.is_tensor(buffer):
@@ -270,7 +288,9 @@ class SummaryHook(TriggeredHook):
         return buffer
 
     def compute_timings(self, timer: 'pt.trainer.ContextTimerDict'):
-        timer_dict = timer.as_dict
+        # Use the lists of the timer and not `timer.as_dict`, the latter
+        # would convert each list to an array, only to reduce it to a scalar.
+        timer_dict = dict(timer.timings)
         # Special handling for time_per_data_loading and time_per_train_step
         #  Calculate
         #   - time_per_iteration: time of loading plus train step per iteration
@@ -284,7 +304,8 @@ class SummaryHook(TriggeredHook):
 
         summary_timings = {}
 
-        sum_time_per_iteration = np.sum(timer_dict.get('time_per_iteration', [0]))
+        sum_time_per_iteration = math.fsum(
+            timer_dict.get('time_per_iteration', [0]))
         if sum_time_per_iteration > 0:
             for k in [
                     'time_per_data_loading',
@@ -299,10 +320,11 @@ class SummaryHook(TriggeredHook):
             ]:
                 if k in timer_dict:
                     summary_timings[k.replace('_per_', '_rel_')] = \
-                        np.sum(timer_dict.pop(k)) / sum_time_per_iteration
+                        math.fsum(timer_dict.pop(k)) / sum_time_per_iteration
 
         summary_timings.update({
-            key: timing.mean() for key, timing in timer_dict.items()
+            key: math.fsum(timing) / len(timing)
+            for key, timing in timer_dict.items()
         })
         timer.clear()
         return summary_timings
@@ -312,6 +334,7 @@ class SummaryHook(TriggeredHook):
 
         for key, timing in self.compute_timings(trainer.train_timer).items():
             self.summary['timings'][key] = timing
+        self._histograms_to_list()
         self.summary = trainer.model.modify_summary(self.summary)
         # Assert the intermediate types were converted in he modify summary
         assert len(self.summary['buffers']) == 0, "intermediate format buffers has to be converted during modify_summary"
@@ -346,10 +369,12 @@ class SummaryHook(TriggeredHook):
             trainer.writer.add_scalar(tag, scalar, iteration)
         for key, scalar in self.summary['timings'].items():
             tag = check_tag(f'{time_prefix}/{key}')
-            trainer.writer.add_scalar(tag, scalar.mean(), iteration)
+            trainer.writer.add_scalar(tag, scalar, iteration)
         for key, histogram in self.summary['histograms'].items():
             tag = check_tag(f'{prefix}/{key}')
-            trainer.writer.add_histogram(tag, np.array(histogram), iteration)
+            # asarray does not copy arrays, e.g. set by modify_summary
+            trainer.writer.add_histogram(
+                tag, np.asarray(histogram), iteration)
         for key, audio in self.summary['audios'].items():
             tag = check_tag(f'{prefix}/{key}')
             if isinstance(audio, (tuple, list)):
@@ -475,6 +500,7 @@ class ValidationHook(SummaryHook):
         self.ckpt_ranking = []
         self.n_degradations = 0
         self.last_validation = -1
+        self._best_symlink_outdated = False
 
     @property
     def priority(self):
@@ -501,6 +527,7 @@ class ValidationHook(SummaryHook):
         assert len(self.summary['timings']) == 0, self.summary['timings']
         for key, timing in self.compute_timings(trainer.validate_timer).items():
             self.summary['timings'][key] = timing
+        self._histograms_to_list()
         try:
             self.summary = trainer.model.modify_summary(self.summary)
         except Exception as e:
@@ -535,24 +562,29 @@ class ValidationHook(SummaryHook):
         # current best checkpoint.
         assert all([len(value) == 0 for value in self.summary.values()]), self.summary
         assert len(trainer.validate_timer.timings) == 0, trainer.validate_timer
+        # Stale checkpoints are deleted below, hence an asynchronous write
+        # has to be finished.
+        trainer.wait_for_checkpoint()
         print('Starting Validation')
         at_least_one_value = False
 
         # Save and restore the value of create_snapshot
         create_snapshot = trainer.model.create_snapshot
         trainer.model.create_snapshot = True
-        for example, model_out, review in trainer.validate(self.iterator):
-            at_least_one_value = True
-            trainer.model.create_snapshot = False
-            self.update_summary(review)
-        trainer.model.create_snapshot = create_snapshot
-        if not at_least_one_value:
-            raise Exception(
-                f'Got an empty validation iterator: {self.iterator}'
-            )
-
+        # Switch once to eval mode for the validation and modify_summary.
+        # trainer.validate keeps the eval mode and does not toggle it again.
         trainer.model.eval()
         try:
+            for example, model_out, review in trainer.validate(self.iterator):
+                at_least_one_value = True
+                trainer.model.create_snapshot = False
+                self.update_summary(review)
+            trainer.model.create_snapshot = create_snapshot
+            if not at_least_one_value:
+                raise Exception(
+                    f'Got an empty validation iterator: {self.iterator}'
+                )
+
             # trainer.model.modify_summary should be called in eval mode
             self.finalize_summary(trainer)
         finally:
@@ -601,7 +633,10 @@ class ValidationHook(SummaryHook):
             # a symlink to the latest checkpoint can not be set during ValidationHook.pre_step
             ckpt_dir = trainer.checkpoint_dir
             ckpt_path: Path = trainer.default_checkpoint_path()
-            if not ckpt_path.exists():
+            if not (
+                    ckpt_path.exists()
+                    or trainer.is_checkpoint_pending(ckpt_path)
+            ):
                 raise RuntimeError(
                     'Before each validation the CheckpointHook has to write '
                     f'a checkpoint.\n'
@@ -609,7 +644,19 @@ class ValidationHook(SummaryHook):
                     f'Found only:\n'
                     f'{[str(file) for file in ckpt_dir.iterdir()]}'
                 )
-            self.set_best_symlink(ckpt_dir)
+            self._best_symlink_outdated = True
+        if self._best_symlink_outdated:
+            # A checkpoint that is written in the background (see
+            # `Trainer.async_checkpoint`) is linked in a later step, once it
+            # is on the disk, so the symlink never dangles.
+            ckpt_dir = trainer.checkpoint_dir
+            best_ckpt_path = ckpt_dir / self.ckpt_ranking[0][0]
+            if (
+                    best_ckpt_path.exists()
+                    or not trainer.is_checkpoint_pending(best_ckpt_path)
+            ):
+                self.set_best_symlink(ckpt_dir)
+                self._best_symlink_outdated = False
 
     def set_best_symlink(self, ckpt_dir):
         best_ckpt_path = ckpt_dir / self._best_ckpt_name
@@ -626,7 +673,10 @@ class ValidationHook(SummaryHook):
         if trainer.checkpoint_dir.exists():
             # When checkpoint_dir does not exist, your training failed, before
             # the first validation started
+            # The best checkpoint may still be written in the background.
+            trainer.wait_for_checkpoint()
             self.set_best_symlink(trainer.checkpoint_dir)
+            self._best_symlink_outdated = False
         ckpt_name = trainer.default_checkpoint_path().name
         if ckpt_name not in [ckpt[0] for ckpt in self.ckpt_ranking]:
             # add to ranking to make sure it is deleted after resume
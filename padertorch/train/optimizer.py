@@ -24,9 +24,16 @@ class Optimizer:
             'The optimizer is not initialized, call set_parameter before' \
             ' using any of the optimizer functions'
 
-    def zero_grad(self):
+    def zero_grad(self, set_to_none=True):
+        """
+        Args:
+            set_to_none: If True, set the grads to None instead of filling
+                them with zeros. This avoids a memset of all grads and the
+                next backward can assign the grads instead of accumulating.
+                clip_grad ignores parameters without a grad.
+        """
         self.check_if_set()
-        return self.optimizer.zero_grad()
+        return self.optimizer.zero_grad(set_to_none=set_to_none)
 
     def step(self):
         self.check_if_set()
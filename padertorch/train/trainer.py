@@ -2,8 +2,10 @@
     This module contains the Trainer class which can be used to train
     configurable padertorch models.
 """
+import array
 import sys
-import contextlib
+import concurrent.futures
+import io
 import itertools
 import time
 from collections import defaultdict
@@ -48,6 +50,9 @@ class Trainer(Configurable):
             checkpoint_trigger=(1, 'epoch'),
             stop_trigger=(1, 'epoch'),
             virtual_minibatch_size=1,
+            async_checkpoint=False,
+            cudnn_benchmark=False,
+            pin_memory=False,
     ):
         """
 
@@ -86,6 +91,24 @@ class Trainer(Configurable):
                 Note: The gradients are accumulated and not averaged.
                 Note: The virtual_minibatch_size is fixed and can contain data
                     from two epochs.
+            async_checkpoint: If True, the checkpoints are serialized in
+                memory and written to the disk in a background thread, while
+                the training continues. At most one checkpoint is written
+                at a time and it is waited for the write before a checkpoint
+                is loaded and at the end of the training.
+            cudnn_benchmark: Value for `torch.backends.cudnn.benchmark`
+                during the training. If True, cuDNN benchmarks the
+                convolution algorithms for each new input shape and uses the
+                fastest. This is only beneficial, when the shapes are fixed
+                (e.g. fixed batch size and crop length), otherwise each new
+                shape triggers a new benchmark.
+            pin_memory: If True and the training runs on gpu, copy each
+                example (of the training, also with multiple gpus, and of
+                the validation) with `pt.data.example_to_pinned_memory` to
+                pinned memory before `model.example_to_device`, so that the
+                transfer to the gpu is asynchronous.
+                This copy is done in the main thread. Pinning the examples
+                in the prefetch threads of the data pipeline is cheaper.
 
 
         Usage:
@@ -132,7 +155,13 @@ class Trainer(Configurable):
         self.epoch = -1
 
         self.loss_weights = loss_weights
+        self._loss_weight_cache = None  # (cache_key, weight_tensor)
         self.virtual_minibatch_size = virtual_minibatch_size
+        self.async_checkpoint = async_checkpoint
+        self.cudnn_benchmark = cudnn_benchmark
+        self.pin_memory = pin_memory
+        self._checkpoint_executor = None
+        self._pending_checkpoint = None  # (checkpoint_path, future)
 
         self.hooks = [
             SummaryHook(summary_trigger),
@@ -276,7 +305,7 @@ class Trainer(Configurable):
             self.iteration = 0
             self.epoch = 0
         torch.backends.cudnn.enabled = True
-        torch.backends.cudnn.benchmark = False
+        torch.backends.cudnn.benchmark = self.cudnn_benchmark
 
         # Change model to train mode (e.g. activate dropout)
         self.model.train()
@@ -456,6 +485,7 @@ class Trainer(Configurable):
             try:
                 for hook in hooks:
                     hook.close(self)
+                self.wait_for_checkpoint()
             except Exception:
                 print('Exception in finally. May hide actual exception!!!\n'
                       'You may comment this finally block for debugging.')
@@ -482,7 +512,11 @@ class Trainer(Configurable):
         # Disable backward mode with `no_grad()`.
         with self.validate_timer['validation_time'], torch.no_grad():
             # Change model to eval mode (e.g. deactivate dropout).
-            self.model.eval()
+            # Each change walks over all modules, hence skip it, when the
+            # caller (e.g. the ValidationHook) already switched to eval mode.
+            training = self.model.training
+            if training:
+                self.model.eval()
             try:
                 validation_iter = iter(validation_iterator)
                 while True:
@@ -498,15 +532,16 @@ class Trainer(Configurable):
                     del example, step_output
 
             finally:
-                self.model.train()
+                if training:
+                    self.model.train()
                 self._non_validation_start_time = self.validate_timer.timestamp()
 
     def optimizer_zero_grad(self):
         if isinstance(self.optimizer, dict):
             for opti in self.optimizer.values():
-                opti.zero_grad()
+                opti.zero_grad(set_to_none=True)
         else:
-            self.optimizer.zero_grad()
+            self.optimizer.zero_grad(set_to_none=True)
 
     def optimizer_step(self):
         summary = self.clip_grad({})
@@ -514,11 +549,15 @@ class Trainer(Configurable):
         # Add learning rate to the summary
         if isinstance(self.optimizer, dict):
             for key, optim in self.optimizer.items():
-                for i, param_group in enumerate(optim.optimizer.param_groups):
-                    summary['scalars'][f'lr/{key}/param_group_{i}'] = param_group['lr']
+                param_groups = optim.optimizer.param_groups
+                for tag, param_group in zip(
+                        _lr_tags(key, len(param_groups)), param_groups):
+                    summary['scalars'][tag] = param_group['lr']
         else:
-            for i, param_group in enumerate(self.optimizer.optimizer.param_groups):
-                summary['scalars'][f'lr/param_group_{i}'] = param_group['lr']
+            param_groups = self.optimizer.optimizer.param_groups
+            for tag, param_group in zip(
+                    _lr_tags(None, len(param_groups)), param_groups):
+                summary['scalars'][tag] = param_group['lr']
 
         # Do the actual optimization
         if isinstance(self.optimizer, dict):
@@ -541,6 +580,9 @@ class Trainer(Configurable):
         try:
             # TODO: Backup OutOfMemory
             with timer['time_per_to_device']:
+                if self.pin_memory and self.device is not None \
+                        and self.device.type == 'cuda':
+                    example = pt.data.example_to_pinned_memory(example)
                 example = model.example_to_device(example, device)
             with timer['time_per_forward']:
                 model_out = model(example)
@@ -604,10 +646,13 @@ class Trainer(Configurable):
                         f'{textwrap.indent(pretty(loss_weights), " "*4)}'
                     )
 
+            weights = {
+                key: loss_weights[key] if loss_weights is not None else 1.
+                for key in losses.keys()
+            }
+            loss = self._combine_losses(losses, weights)
             for key, value in losses.items():
-                weight = loss_weights[key] if loss_weights is not None else 1.
-                if weight != 0:
-                    loss = loss + (weight * value)
+                weight = weights[key]
                 review['scalars'][key] = value.item()
                 review['scalars'][f'{key}_loss_weight'] = weight
             del review['losses']
@@ -636,6 +681,54 @@ class Trainer(Configurable):
 
         return loss, review
 
+    def _combine_losses(self, losses, weights):
+        """
+        Computes sum(weights[k] * losses[k] for k in losses), where losses
+        with a weight of zero are ignored (i.e. a nan in such a loss does
+        not propagate to the combined loss).
+
+        Multiple losses are stacked and reduced with a single dot product
+        instead of a chain of mul and add ops, i.e. the backward graph has
+        only two nodes, independent of the number of losses.
+        The weight tensor is cached, until the weights (e.g. changed by the
+        LossWeightAnnealingHook), the device or the dtype change.
+
+        >>> t = Trainer.__new__(Trainer)
+        >>> t._loss_weight_cache = None
+        >>> losses = {'a': torch.tensor(1.), 'b': torch.tensor(2.)}
+        >>> t._combine_losses(losses, {'a': 1., 'b': 0.5})
+        tensor(2.)
+        >>> t._combine_losses(losses, {'a': 0, 'b': 2})
+        tensor(4.)
+        >>> t._combine_losses({'a': torch.tensor(float('nan')), **losses}, {'a': 0, 'b': 2})
+        tensor(4.)
+        """
+        keys = tuple([k for k, w in weights.items() if w != 0])
+        values = [losses[k] for k in keys]
+        if len(values) < 2 or not all(
+                isinstance(v, torch.Tensor) and v.dim() == 0
+                and v.device == values[0].device
+                for v in values
+        ):
+            loss = 0.
+            for key, value in zip(keys, values):
+                loss = loss + (weights[key] * value)
+            return loss
+
+        values = torch.stack(values)
+        cache_key = (
+            keys, tuple([weights[k] for k in keys]),
+            values.device, values.dtype,
+        )
+        cache = self._loss_weight_cache
+        if cache is None or cache[0] != cache_key:
+            # Keep only the latest weights, because an annealing of the
+            # weights would otherwise fill the cache.
+            cache = self._loss_weight_cache = (cache_key, torch.tensor(
+                cache_key[1], device=values.device, dtype=values.dtype
+            ))
+        return torch.dot(values, cache[1])
+
     def log_error_state(self, data_dict, folder='log', file=sys.stdout):
         """
 
@@ -764,11 +857,10 @@ class Trainer(Configurable):
                 grad_norm = opti.clip_grad()
                 check(grad_norm)
 
-                summary['scalars'][f'{key}_grad_norm'] = grad_norm
-                # underscore was necessary to obtain unique keys to prevent
-                # tensorboard error
-                summary['histograms'][
-                    f'{key}_grad_norm_'] = torch.Tensor([grad_norm])
+                scalar_tag, histogram_tag = _grad_norm_tags(key)
+                summary['scalars'][scalar_tag] = grad_norm
+                summary['histograms'][histogram_tag] = \
+                    torch.Tensor([grad_norm])
         else:
             grad_norm = self.optimizer.clip_grad()
             check(grad_norm)
@@ -799,6 +891,12 @@ class Trainer(Configurable):
                 epoch=self.epoch,
                 optimizer=optimizer_state_dict,
                 hooks=dict(),
+                rng_state=dict(
+                    torch=torch.get_rng_state(),
+                    # Do not initialize cuda only to get the rng state.
+                    cuda=torch.cuda.get_rng_state_all()
+                    if torch.cuda.is_initialized() else [],
+                ),
         )
         for hook in self.hooks:
             if hook is not self.model:
@@ -812,19 +910,58 @@ class Trainer(Configurable):
         if checkpoint_path is None:
             checkpoint_path = self.default_checkpoint_path()
 
-        torch.save(
-            self.state_dict(),
-            str(checkpoint_path)
-        )
+        # At most one checkpoint is written at a time
+        self.wait_for_checkpoint()
+
+        if self.async_checkpoint:
+            # The serialization has to be synchronous, because the training
+            # changes the parameters in-place. Only the (slow) write to the
+            # disk is done in the background.
+            buffer = io.BytesIO()
+            torch.save(
+                self.state_dict(), buffer,
+                pickle_protocol=_CHECKPOINT_PICKLE_PROTOCOL,
+            )
+            if self._checkpoint_executor is None:
+                self._checkpoint_executor = \
+                    concurrent.futures.ThreadPoolExecutor(max_workers=1)
+            self._pending_checkpoint = (
+                checkpoint_path,
+                # The symlink to the latest checkpoint is updated by the
+                # background task after the write, otherwise it would
+                # dangle until the write is finished.
+                self._checkpoint_executor.submit(
+                    _write_checkpoint, checkpoint_path, buffer.getbuffer(),
+                    self.iteration,
+                ),
+            )
+        else:
+            # A large buffer reduces the number of write calls, which are
+            # expensive on network filesystems.
+            with open(checkpoint_path, 'wb', buffering=16 << 20) as fd:
+                torch.save(
+                    self.state_dict(), fd,
+                    pickle_protocol=_CHECKPOINT_PICKLE_PROTOCOL,
+                )
+            _finish_checkpoint(checkpoint_path, self.iteration)
 
-        # Create relative symlink to latest checkpoint
-        latest_symlink_path = (checkpoint_path.parent / f'ckpt_latest.pth').absolute()
-        if latest_symlink_path.is_symlink():
-            latest_symlink_path.unlink()
-        latest_symlink_path.symlink_to(checkpoint_path.name)
+    def is_checkpoint_pending(self, checkpoint_path):
+        """True, if `checkpoint_path` is currently written in the background.
+        """
+        return (
+            self._pending_checkpoint is not None
+            and self._pending_checkpoint[0] == checkpoint_path
+        )
 
-        print(f"{datetime.now()}: Saved model and optimizer state "
-              f"at iteration {self.iteration} to {checkpoint_path}")
+    def wait_for_checkpoint(self):
+        """Waits until the checkpoint that is written in the background
+        (see `async_checkpoint`) is on the disk. Reraises the exception of
+        the write, if it failed.
+        """
+        if self._pending_checkpoint is not None:
+            _, future = self._pending_checkpoint
+            self._pending_checkpoint = None
+            future.result()
 
     def load_state_dict(self, state_dict):
         self.model.load_state_dict(state_dict['model'])
@@ -841,6 +978,17 @@ class Trainer(Configurable):
         self.iteration = state_dict['iteration']
         self.epoch = state_dict['epoch']
 
+        if 'rng_state' in state_dict:
+            # Continue the random numbers (e.g. dropout) of the checkpoint
+            # on resume, instead of the state of the new process.
+            # Older checkpoints have no rng_state.
+            torch.set_rng_state(state_dict['rng_state']['torch'].cpu())
+            cuda_rng_state = state_dict['rng_state']['cuda']
+            if len(cuda_rng_state) > 0 \
+                    and len(cuda_rng_state) == torch.cuda.device_count():
+                torch.cuda.set_rng_state_all(
+                    [state.cpu() for state in cuda_rng_state])
+
         if 'hooks' in state_dict:
             hook_states = state_dict['hooks']
             for hook in self.hooks:
@@ -856,6 +1004,7 @@ class Trainer(Configurable):
             )
 
     def load_checkpoint(self, map_location='cpu'):
+        self.wait_for_checkpoint()
         checkpoint_path = self.checkpoint_dir / 'ckpt_latest.pth'
         assert checkpoint_path.is_file(), checkpoint_path
 
@@ -900,6 +1049,61 @@ class Trainer(Configurable):
         return self.to(device)
 
 
+# Protocol 4 (Python >= 3.4) uses framing and supports objects larger than
+# 4 GiB. torch.save defaults to protocol 2.
+_CHECKPOINT_PICKLE_PROTOCOL = 4
+
+
+@functools.lru_cache(maxsize=None)
+def _grad_norm_tags(key):
+    """
+    Scalar and histogram tag of the grad norm of the optimizer `key`.
+    Cached, because `Trainer.clip_grad` needs them in each step.
+
+    >>> _grad_norm_tags('enc')
+    ('enc_grad_norm', 'enc_grad_norm_')
+    """
+    # underscore was necessary to obtain unique keys to prevent
+    # tensorboard error
+    return f'{key}_grad_norm', f'{key}_grad_norm_'
+
+
+@functools.lru_cache(maxsize=None)
+def _lr_tags(key, num_param_groups):
+    """
+    Tags of the learning rates of the param groups of the optimizer `key`.
+    Cached, because `Trainer.optimizer_step` needs them in each step.
+
+    >>> _lr_tags(None, 2)
+    ('lr/param_group_0', 'lr/param_group_1')
+    >>> _lr_tags('enc', 1)
+    ('lr/enc/param_group_0',)
+    """
+    prefix = 'lr' if key is None else f'lr/{key}'
+    return tuple([
+        f'{prefix}/param_group_{i}' for i in range(num_param_groups)
+    ])
+
+
+def _finish_checkpoint(checkpoint_path, iteration):
+    # Create relative symlink to latest checkpoint
+    latest_symlink_path = (checkpoint_path.parent / f'ckpt_latest.pth').absolute()
+    if latest_symlink_path.is_symlink():
+        latest_symlink_path.unlink()
+    latest_symlink_path.symlink_to(checkpoint_path.name)
+
+    print(f"{datetime.now()}: Saved model and optimizer state "
+          f"at iteration {iteration} to {checkpoint_path}")
+
+
+def _write_checkpoint(checkpoint_path, data, iteration):
+    import paderbox as pb
+    # Atomic, so that a partially written checkpoint is never visible.
+    with pb.io.atomic.open_atomic(checkpoint_path, 'wb') as fd:
+        fd.write(data)
+    _finish_checkpoint(checkpoint_path, iteration)
+
+
 class MultiDeviceTrainer(Trainer):
     """
 
@@ -940,6 +1144,7 @@ class ContextTimerDict:
     ...     time.sleep(0.1)
 
     Ignore timing when an exception is raised
+    >>> import contextlib
     >>> with contextlib.suppress(Exception), timer['test_2']:
     ...     raise Exception
 
@@ -965,33 +1170,57 @@ class ContextTimerDict:
 """
     def __init__(self):
         self.timestamp = time.perf_counter  # time.process_time
-        self.timings = defaultdict(list)
+        # array.array stores the timings as unboxed doubles (8 bytes instead
+        # of a float object per measurement) and np.array converts it with
+        # a memcpy instead of a loop over python floats.
+        self.timings = defaultdict(functools.partial(array.array, 'd'))
         self.clear()
 
     def clear(self):
         self.timings.clear()
 
-    class Excluder:
-        def __init__(self, timestamp):
-            self.duration = []
-            self.timestamp = timestamp
+    class Scope:
+        """
+        Context manager that is returned by `ContextTimerDict.__getitem__`.
+        A plain class (instead of `contextlib.contextmanager`) avoids the
+        construction of a generator in each measurement.
+        """
+        __slots__ = ('timer', 'key', 'start', 'excluded')
+
+        def __init__(self, timer, key):
+            self.timer = timer
+            self.key = key
+            self.excluded = 0
+
+        def __enter__(self):
+            self.start = self.timer.timestamp()
+            return self
+
+        def __exit__(self, exc_type, exc_val, exc_tb):
+            end = self.timer.timestamp()
+            # Ignore timing when an exception is raised
+            if exc_type is None:
+                self.timer.timings[self.key].append(
+                    end - self.start - self.excluded)
 
-        @contextlib.contextmanager
         def pause(self):
-            start = self.timestamp()
-            yield
-            end = self.timestamp()
-            self.duration.append(end -start)
+            return ContextTimerDict.Pause(self)
+
+    class Pause:
+        __slots__ = ('scope', 'start')
+
+        def __init__(self, scope):
+            self.scope = scope
+
+        def __enter__(self):
+            self.start = self.scope.timer.timestamp()
 
+        def __exit__(self, exc_type, exc_val, exc_tb):
+            self.scope.excluded += self.scope.timer.timestamp() - self.start
 
-    @contextlib.contextmanager
     def __getitem__(self, item):
         assert isinstance(item, str), item
-        start = self.timestamp()
-        excluder = self.Excluder(self.timestamp)
-        yield excluder
-        end = self.timestamp()
-        self.timings[item].append(end - start - sum(excluder.duration))
+        return self.Scope(self, item)
 
     @property
     def as_dict(self):
@@ -1008,12 +1237,10 @@ class ContextTimerDict:
 
         class StopIterationIgnoredByContextlib(Exception):
             pass
-            # contextlib.contextmanager tries to inform the user with a
-            # DeprecationWarning because of PEP 479.
-            # The cas here is still conform with PEP 479 (i.e. use __future__
-            # import).
-            # To suppress the warning, convert StopIteration to this Exception
-            # and catch it.
+            # A StopIteration must not be raised inside a generator
+            # (PEP 479). Also, an exception inside `self[key]` ignores the
+            # timing of the last `next` call.
+            # Hence, convert StopIteration to this Exception and catch it.
 
         try:
             while True:
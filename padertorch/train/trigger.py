@@ -79,26 +79,29 @@ class IntervalTrigger(Trigger):
         assert isinstance(self.period, int), (type(self.period), self.period)
         assert unit == 'epoch' or unit == 'iteration', unit
         self.unit = unit
-        self.last = (-1, -1)
+        # The triggers are called in each iteration, hence resolve the unit
+        # once and not with string compares in each call.
+        self._by_epoch = unit == 'epoch'
+        self.set_last(-1, -1)
 
     def __call__(self, iteration, epoch):
-        if self.unit == 'epoch':
-            index = epoch
-            last = self.last[1]
-        elif self.unit == 'iteration':
-            index = iteration
-            last = self.last[0]
-        else:
-            raise ValueError(self.unit, 'Expect epoch or iteration')
-
-        if last == index:
+        # Triggers at the first call, where the index reaches the next
+        # multiple of the period. For the trainer, which calls the trigger
+        # for each index, this is identical to `index % period == 0`, but
+        # the common case is a single compare.
+        index = epoch if self._by_epoch else iteration
+        if index < self._next_index:
             return False
         else:
             self.set_last(iteration, epoch)
-            return (index % self.period) == 0
+            return True
 
     def set_last(self, iteration, epoch):
+        """Set the index of the last trigger, e.g. on resume or back off."""
         self.last = (iteration, epoch)
+        index = epoch if self._by_epoch else iteration
+        # Smallest multiple of the period, that is larger than index.
+        self._next_index = (index // self.period + 1) * self.period
 
 
 class EndTrigger(IntervalTrigger):
@@ -133,12 +136,10 @@ class EndTrigger(IntervalTrigger):
         8 2 True
         9 3 True
         """
-        if self.unit == 'epoch':
+        if self._by_epoch:
             return epoch >= self.period
-        elif self.unit == 'iteration':
-            return iteration >= self.period
         else:
-            raise ValueError(self.unit, 'Expect epoch or iteration')
+            return iteration >= self.period
 
 
 class NotTrigger(Trigger):
@@ -1,6 +1,6 @@
 import torch
 from padertorch.ops.sequence.mask import compute_mask
-from padertorch.modules.normalization import normalize
+from padertorch.modules.normalization import Normalization, normalize
 import paderbox.testing as tc
 
 
@@ -68,3 +68,45 @@ def test_outputs_and_grads():
             tc.assert_array_almost_equal(x.grad.numpy(), x_ref.grad.numpy(), decimal=4)
             tc.assert_array_almost_equal(gamma.grad.numpy(), gamma_ref.grad.numpy(), decimal=4)
             tc.assert_array_almost_equal(beta.grad.numpy(), beta_ref.grad.numpy(), decimal=4)
+
+
+def test_running_std_and_inverse():
+    norm = Normalization(
+        data_format='bct', shape=(None, 3, None), statistics_axis='bt',
+        momentum=0.5,
+    )
+    x = 1 + 2 * torch.randn((4, 3, 7))
+    norm(x)
+    norm.eval()
+    std = norm.running_std
+    tc.assert_array_almost_equal(
+        std.numpy(), torch.sqrt(norm.running_var + norm.eps).numpy()
+    )
+    assert norm.running_std is std
+    tc.assert_array_almost_equal(
+        norm.inverse(norm(x)).detach().numpy(), x.numpy(), decimal=5
+    )
+
+    # The cache is invalidated, when the running statistics change
+    norm.train()
+    norm(x + 1)
+    assert norm.running_std is not std
+    tc.assert_array_almost_equal(
+        norm.running_std.numpy(),
+        torch.sqrt(norm.running_var + norm.eps).numpy()
+    )
+
+    # ... and when they are loaded or moved
+    std = norm.running_std
+    state_dict = norm.state_dict()
+    # A larger power keeps the variance positive
+    state_dict['running_power'] = 2 * state_dict['running_power']
+    norm.load_state_dict(state_dict, assign=True)
+    assert norm.running_std is not std
+    tc.assert_array_almost_equal(
+        norm.running_std.numpy(),
+        torch.sqrt(norm.running_var + norm.eps).numpy()
+    )
+    std = norm.running_std
+    norm.double()
+    assert norm.running_std.dtype == torch.float64, norm.running_std.dtype
@@ -1,3 +1,4 @@
+import types
 import unittest
 
 import numpy as np
@@ -172,6 +173,28 @@ class TestKLLoss(unittest.TestCase):
         reference_loss = kl_divergence(q, p)
         np.testing.assert_allclose(actual_loss, reference_loss, rtol=1e-4)
 
+    def test_against_normal_normal(self):
+        B = 50
+        K = 10
+        D = 16
+
+        p = Normal(loc=torch.randn((K, D)), scale=torch.rand((K, D)) + 0.1)
+        q = Normal(
+            loc=torch.randn((B, D)), scale=torch.rand((B, D)) + 0.1
+        )
+
+        actual_loss = pt.ops.losses.gaussian_kl_divergence(q, p)
+        reference_loss = kl_divergence(
+            Normal(loc=q.loc[:, None], scale=q.scale[:, None]), p
+        ).sum(-1)
+        np.testing.assert_allclose(actual_loss, reference_loss, rtol=1e-4)
+
+        # Only loc and scale of the posterior are used
+        q_ = types.SimpleNamespace(loc=q.loc, scale=q.scale)
+        np.testing.assert_allclose(
+            pt.ops.losses.gaussian_kl_divergence(q_, p), actual_loss
+        )
+
     def test_shapes(self):
         B1 = 100
         B2 = 50
@@ -124,6 +124,7 @@ def test_summary_hook():
 
             class Timer:
                 as_dict = {}
+                timings = {}
                 def clear(self): pass
             train_timer = Timer()
 
@@ -327,6 +328,20 @@ def test_validation_hook_modify_summary_training_flag():
         trainer.train(ds_train)
 
 
+def test_modify_summary_non_finite_scalars():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model = DummyModel([], tmp_dir, pt.optimizer.Adam())
+    with np.errstate(invalid='ignore', over='ignore'):
+        summary = model.modify_summary({'scalars': {
+            'loss': [0.5, 1.5],
+            'inf': [float('inf'), float('-inf')],
+            'overflow': [1e308, 1e308],
+        }, 'buffers': {}, 'snapshots': {}})
+    assert summary['scalars']['loss'] == 1.0, summary
+    assert np.isnan(summary['scalars']['inf']), summary
+    assert np.isinf(summary['scalars']['overflow']), summary
+
+
 def test_backoff():
     ds = [0]
     with tempfile.TemporaryDirectory() as tmp_dir:
@@ -1,5 +1,6 @@
 import os
 import tempfile
+import time
 from pathlib import Path
 import inspect
 import textwrap
@@ -756,3 +757,104 @@ def test_log_error_state():
                     f'{tmp_dir}/log/error_state_file_name.pth', 'rb'
             ) as opened_file:
                 assert not torch.serialization._is_zipfile(opened_file)
+
+
+def test_async_checkpoint():
+    rng = np.random.RandomState(0)
+    tr_dataset, dt_dataset = [
+        [
+            {'image': rng.rand(28, 28).astype(np.float32), 'digit': i}
+            for i in range(2)
+        ]
+        for _ in range(2)
+    ]
+
+    class LatestSymlinkHook(pt.train.hooks.Hook):
+        # The symlinks to the latest and the best checkpoint may never
+        # dangle, otherwise a resume or an evaluation after a crash would
+        # fail.
+        def check(self, trainer):
+            for name in ['ckpt_latest.pth', 'ckpt_best_loss.pth']:
+                symlink = trainer.checkpoint_dir / name
+                if symlink.is_symlink():
+                    assert symlink.exists(), (symlink, os.readlink(symlink))
+            self.num_checks += 1
+
+        def pre_step(self, trainer):
+            self.check(trainer)
+
+        def post_step(self, trainer, example, model_output, review):
+            self.check(trainer)
+
+        def close(self, trainer):
+            self.check(trainer)
+
+    checkpoints = {}
+    for async_checkpoint in [False, True]:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            torch.manual_seed(0)
+            t = pt.Trainer(
+                Model(),
+                optimizer=pt.optimizer.Adam(),
+                storage_dir=str(tmp_dir),
+                stop_trigger=(2, 'epoch'),
+                summary_trigger=(1, 'epoch'),
+                checkpoint_trigger=(1, 'iteration'),
+                async_checkpoint=async_checkpoint,
+            )
+            t.register_validation_hook(dt_dataset, max_checkpoints=2)
+            symlink_hook = LatestSymlinkHook()
+            symlink_hook.num_checks = 0
+            t.register_hook(symlink_hook)
+            write_checkpoint = pt.train.trainer._write_checkpoint
+
+            def slow_write_checkpoint(*args, **kwargs):
+                # Make sure the write is still running, when the hooks run.
+                time.sleep(0.05)
+                return write_checkpoint(*args, **kwargs)
+
+            with mock.patch(
+                    'padertorch.train.trainer._write_checkpoint',
+                    slow_write_checkpoint,
+            ):
+                t.train(tr_dataset, device='cpu')
+            assert symlink_hook.num_checks > 0, symlink_hook.num_checks
+            assert t._pending_checkpoint is None, t._pending_checkpoint
+            for name in ['ckpt_latest.pth', 'ckpt_best_loss.pth']:
+                symlink = Path(tmp_dir) / 'checkpoints' / name
+                assert symlink.exists(), symlink
+            assert (t._checkpoint_executor is not None) == async_checkpoint
+
+            ckpt_dir = Path(tmp_dir) / 'checkpoints'
+            checkpoints[async_checkpoint] = {
+                f.name: torch.load(f, weights_only=False)
+                for f in ckpt_dir.iterdir()
+            }
+
+    assert checkpoints[False].keys() == checkpoints[True].keys(), (
+        checkpoints[False].keys(), checkpoints[True].keys())
+    for name, state_dict in checkpoints[False].items():
+        for k, v in state_dict['model'].items():
+            np.testing.assert_equal(
+                v.numpy(), checkpoints[True][name]['model'][k].numpy())
+        assert state_dict['hooks'] == checkpoints[True][name]['hooks']
+
+
+def test_rng_state_in_checkpoint():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        t = pt.Trainer(
+            Model(),
+            optimizer=pt.optimizer.Adam(),
+            storage_dir=str(tmp_dir),
+        )
+        state_dict = copy.deepcopy(t.state_dict())
+        expect = torch.rand(3)
+
+        # Old checkpoints have no rng_state
+        old_state_dict = copy.deepcopy(state_dict)
+        del old_state_dict['rng_state']
+        t.load_state_dict(old_state_dict)
+        assert not torch.equal(torch.rand(3), expect)
+
+        t.load_state_dict(state_dict)
+        np.testing.assert_equal(torch.rand(3).numpy(), expect.numpy())